@@ -38,12 +38,75 @@ class Config:
     
     BATCH_SIZE = 10
     
+    UPSERT_FLUSH_SIZE = 50
+    LAW_VERSION_SNAPSHOT_INTERVAL = 10
+    PIPELINE_CPU_WORKERS = int(os.getenv('PIPELINE_CPU_WORKERS', os.cpu_count() or 1))
+    PIPELINE_QUEUE_SIZE = 64
+    
+    SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', 4))
+    SUMMARY_MAX_ATTEMPTS = 3
+    SUMMARY_RETRY_BASE_SECONDS = 120
+    SUMMARY_RETRY_MAX_SECONDS = 3600
+    SUMMARY_LEASE_SECONDS = 600
+    SUMMARY_DRAIN_MINUTES = 5
+    SUMMARY_CACHE_MAX_MB = int(os.getenv('SUMMARY_CACHE_MAX_MB', 64))
+    SUMMARIZER_BACKEND = os.getenv('SUMMARIZER_BACKEND', 'groq')
+    SUMMARY_EXTRACTIVE_SENTENCES = 8
+    SUMMARY_MODE = os.getenv('SUMMARY_MODE', 'map_reduce')
+    SUMMARY_INPUT_MAX_CHARS = 8000
+    SUMMARY_CHUNK_CHARS = 6000
+    SUMMARY_CHUNK_MAX_TOKENS = 400
+    
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = 'logs/crawler.log'
     
     EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
     
+    DATA_DIR = os.getenv('DATA_DIR', 'data')
+    EMBEDDING_MODEL_DIR = os.path.join(DATA_DIR, 'embeddings')
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'tfidf')
+    HASHING_EMBEDDING_DIM = 2 ** 18
+    EMBEDDING_MAX_FEATURES = 5000
+    EMBEDDING_NGRAM_RANGE = (1, 2)
+    EMBEDDING_MAX_CHARS = 10000
+    EMBEDDING_STORAGE_DTYPE = os.getenv('EMBEDDING_STORAGE_DTYPE', 'float32')
+    EMBEDDING_REFIT_DAY = 'sun'
+    EMBEDDING_REFIT_HOUR = 3
+    
+    PASSAGE_SIZE_CHARS = 2000
+    PASSAGE_OVERLAP_CHARS = 200
+    PASSAGE_EMBED_BATCH_SIZE = 256
+    PASSAGE_SEARCH_FANOUT = 5
+    PASSAGES_PER_RESULT = 3
+    
+    SEARCH_MIN_SCORE = 0.3
+    SEARCH_DEFAULT_MODE = 'semantic'
+    SEARCH_RRF_K = 60
+    SEARCH_HYBRID_DEPTH = 50
+    SEARCH_CACHE_SIZE = 1024
+    SEARCH_CACHE_TTL_SECONDS = 300
+    VECTOR_INDEX_SYNC_SECONDS = 30
+    VECTOR_QUANTIZATION = os.getenv('VECTOR_QUANTIZATION', 'none')
+    QUANTIZED_RERANK_FACTOR = 4
+    
+    INDEX_DIR = os.path.join(DATA_DIR, 'index')
+    ANN_MIN_TRAIN_SIZE = 1000
+    ANN_NPROBE = 8
+    ANN_SHORTLIST_SIZE = 5
+    
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    BM25_TITLE_WEIGHT = 3
+    
+    MINHASH_BANDS = 16
+    MINHASH_DUPLICATE_THRESHOLD = 0.9
+    
     LLM_MODEL = 'llama-3.1-8b-instant'
+    GROQ_REQUESTS_PER_MINUTE = int(os.getenv('GROQ_REQUESTS_PER_MINUTE', 30))
+    GROQ_TOKENS_PER_MINUTE = int(os.getenv('GROQ_TOKENS_PER_MINUTE', 6000))
+    GROQ_MAX_RETRIES = 4
+    GROQ_INPUT_COST_PER_MILLION = 0.05
+    GROQ_OUTPUT_COST_PER_MILLION = 0.08
     
     API_HOST = '0.0.0.0'
     API_PORT = 5000
@@ -3,9 +3,14 @@ from src.database.db import db, create_app
 
 app = create_app()
 
-with app.app_context():
-    import models
-    db.create_all()
+def init_db():
+    # Not run at import: ingest worker processes re-import the main script and must
+    # not open connections or run DDL of their own.
+    with app.app_context():
+        import models
+        from src.database.migrations import run_migrations
+        db.create_all()
+        run_migrations()
 
 from src.api.routes import api_bp
 app.register_blueprint(api_bp, url_prefix='/api')
@@ -174,4 +179,5 @@ def index():
     '''
 
 if __name__ == '__main__':
+    init_db()
     app.run(host='0.0.0.0', port=5000, debug=True)
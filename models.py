@@ -1,31 +1,64 @@
 from datetime import datetime
 from src.database.db import db
+from config.settings import Config
+from src.embeddings import sparse as sparse_embeddings
+import numpy as np
 import json
 
-class LabourLaw(db.Model):
+class EmbeddingMixin:
+    
+    def set_embedding(self, embedding, version=None):
+        dtype = Config.EMBEDDING_STORAGE_DTYPE
+        self.embedding, self.embedding_indices, self.embedding_dim = sparse_embeddings.encode(embedding, dtype)
+        self.embedding_dtype = dtype
+        self.embedding_version = version
+    
+    def get_embedding(self):
+        if self.embedding:
+            return sparse_embeddings.decode(
+                self.embedding, self.embedding_dtype, self.embedding_indices, self.embedding_dim
+            )
+        return None
+
+class LabourLaw(EmbeddingMixin, db.Model):
     __tablename__ = 'labour_laws'
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(500), nullable=False)
     content = db.Column(db.Text, nullable=False)
     summary = db.Column(db.Text)
+    summary_status = db.Column(db.String(20), default='pending', index=True)
     url = db.Column(db.String(1000), unique=True)
     source = db.Column(db.String(255))
     category = db.Column(db.String(100))
     publication_date = db.Column(db.Date)
     language = db.Column(db.String(50), default='en')
-    embedding = db.Column(db.Text)
-    content_hash = db.Column(db.String(64))
+    embedding = db.Column(db.LargeBinary)
+    embedding_indices = db.Column(db.LargeBinary)
+    embedding_dim = db.Column(db.Integer)
+    embedding_dtype = db.Column(db.String(10))
+    embedding_version = db.Column(db.String(50))
+    content_hash = db.Column(db.String(64), index=True)
+    minhash = db.Column(db.LargeBinary)
+    staged_embedding = db.Column(db.LargeBinary)
+    staged_embedding_indices = db.Column(db.LargeBinary)
+    staged_embedding_dim = db.Column(db.Integer)
+    staged_embedding_dtype = db.Column(db.String(10))
+    staged_embedding_version = db.Column(db.String(50), index=True)
     version = db.Column(db.Integer, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def set_embedding(self, embedding_list):
-        self.embedding = json.dumps(embedding_list)
+    def set_embedding(self, embedding, version=None):
+        super().set_embedding(embedding, version)
+        self.staged_embedding_version = None
     
-    def get_embedding(self):
-        if self.embedding:
-            return json.loads(self.embedding)
+    def set_minhash(self, signature):
+        self.minhash = signature.astype(np.uint32).tobytes() if signature is not None else None
+    
+    def get_minhash(self):
+        if self.minhash:
+            return np.frombuffer(self.minhash, dtype=np.uint32)
         return None
     
     def to_dict(self):
@@ -34,16 +67,42 @@ class LabourLaw(db.Model):
             'title': self.title,
             'content': self.content,
             'summary': self.summary,
+            'summary_status': self.summary_status,
             'url': self.url,
             'source': self.source,
             'category': self.category,
             'publication_date': self.publication_date.isoformat() if self.publication_date else None,
             'language': self.language,
             'version': self.version,
+            'embedding_version': self.embedding_version,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class LawPassage(EmbeddingMixin, db.Model):
+    __tablename__ = 'law_passages'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    law_id = db.Column(db.Integer, db.ForeignKey('labour_laws.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    start_offset = db.Column(db.Integer, nullable=False)
+    end_offset = db.Column(db.Integer, nullable=False)
+    embedding = db.Column(db.LargeBinary)
+    embedding_indices = db.Column(db.LargeBinary)
+    embedding_dim = db.Column(db.Integer)
+    embedding_dtype = db.Column(db.String(10))
+    embedding_version = db.Column(db.String(50), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'law_id': self.law_id,
+            'position': self.position,
+            'start': self.start_offset,
+            'end': self.end_offset
+        }
+
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
     
@@ -90,11 +149,21 @@ class CrawlSession(db.Model):
     status = db.Column(db.String(50), default='running')
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
     total_pages = db.Column(db.Integer, default=0)
     inserted = db.Column(db.Integer, default=0)
     updated = db.Column(db.Integer, default=0)
     skipped = db.Column(db.Integer, default=0)
     errors = db.Column(db.Integer, default=0)
+    summarizer_stats = db.Column(db.Text)
+    
+    def set_summarizer_stats(self, stats):
+        self.summarizer_stats = json.dumps(stats)
+    
+    def get_summarizer_stats(self):
+        if self.summarizer_stats:
+            return json.loads(self.summarizer_stats)
+        return {}
     
     def to_dict(self):
         return {
@@ -103,9 +172,142 @@ class CrawlSession(db.Model):
             'status': self.status,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
             'total_pages': self.total_pages,
             'inserted': self.inserted,
             'updated': self.updated,
             'skipped': self.skipped,
-            'errors': self.errors
+            'errors': self.errors,
+            'summarizer_stats': self.get_summarizer_stats()
+        }
+
+class LawVersion(db.Model):
+    __tablename__ = 'labour_law_versions'
+    __table_args__ = (db.UniqueConstraint('law_id', 'version', name='uq_law_version'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    law_id = db.Column(db.Integer, db.ForeignKey('labour_laws.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    title = db.Column(db.String(500))
+    summary = db.Column(db.Text)
+    content_hash = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'law_id': self.law_id,
+            'version': self.version,
+            'kind': self.kind,
+            'title': self.title,
+            'content_hash': self.content_hash,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class SummaryCacheEntry(db.Model):
+    __tablename__ = 'summary_cache'
+    __table_args__ = (db.UniqueConstraint('content_hash', 'model', 'prompt_version', name='uq_summary_cache_key'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    prompt_version = db.Column(db.String(20), nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    size_bytes = db.Column(db.Integer, default=0)
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class SummaryJob(db.Model):
+    __tablename__ = 'summary_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    law_id = db.Column(db.Integer, db.ForeignKey('labour_laws.id'), nullable=False, index=True)
+    law_version = db.Column(db.Integer, default=1)
+    status = db.Column(db.String(20), default='pending', index=True)
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    next_attempt_at = db.Column(db.DateTime, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'law_id': self.law_id,
+            'law_version': self.law_version,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+class CrawlFrontier(db.Model):
+    __tablename__ = 'crawl_frontier'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    crawl_session_id = db.Column(db.String(50), nullable=False, index=True)
+    kind = db.Column(db.String(20), default='page')
+    url = db.Column(db.String(1000), nullable=False)
+    source = db.Column(db.String(255))
+    title = db.Column(db.String(500))
+    is_pdf = db.Column(db.Boolean, default=False)
+    status = db.Column(db.String(50), default='pending')
+    result = db.Column(db.String(50))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_entry(self):
+        return {
+            'url': self.url,
+            'source': self.source,
+            'title': self.title,
+            'is_pdf': self.is_pdf
+        }
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'crawl_session_id': self.crawl_session_id,
+            'kind': self.kind,
+            'url': self.url,
+            'source': self.source,
+            'status': self.status,
+            'result': self.result,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class EmbeddingJob(db.Model):
+    __tablename__ = 'embedding_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(50), unique=True)
+    status = db.Column(db.String(50), default='pending')
+    target_version = db.Column(db.String(50))
+    total = db.Column(db.Integer, default=0)
+    processed = db.Column(db.Integer, default=0)
+    last_law_id = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'status': self.status,
+            'target_version': self.target_version,
+            'total': self.total,
+            'processed': self.processed,
+            'progress': round(100.0 * self.processed / self.total, 1) if self.total else 0.0,
+            'last_law_id': self.last_law_id,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
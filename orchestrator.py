@@ -4,26 +4,34 @@ from datetime import datetime
 from src.crawler.web_crawler import web_crawler
 from src.database.upsert_service import upsert_service
 from src.utils.logger import logger
-from main import app
+from main import app, init_db
 from src.database.db import db
 from models import LabourLaw, CrawlSession, AuditLog
+from config.settings import Config
 
-def run_crawl():
+def run_crawl(resume=None):
+    from src.database.crawl_sessions import run_crawl_session
+    
     logger.info("="*60)
     logger.info("Starting Labour Law Crawl Job")
     logger.info(f"Timestamp: {datetime.utcnow().isoformat()}")
     logger.info("="*60)
     
     with app.app_context():
-        items = web_crawler.crawl_all()
-        
-        if not items:
-            logger.warning("No items found during crawl")
+        try:
+            result = run_crawl_session(web_crawler, resume, summarize=summarize_pending)
+        except Exception as e:
+            logger.error(f"Crawl failed: {e}")
+            logger.info("Resume with: python orchestrator.py crawl --resume")
             return
         
-        logger.info(f"Found {len(items)} items to process")
+        if resume and not result:
+            logger.error("No resumable crawl session found")
+            return
         
-        result = upsert_service.process_batch(items)
+        if not result['stats']['total']:
+            logger.warning("No items found during crawl")
+            return
         
         logger.info("="*60)
         logger.info("Crawl Job Completed")
@@ -49,6 +57,55 @@ def crawl_url(url):
         
         logger.info(f"Result: {result}")
 
+def summarize_pending(limit=None, workers=None, backend=None):
+    from src.summarizer.summary_queue import summary_queue
+    from src.summarizer.metrics import summarizer_metrics
+    
+    with app.app_context():
+        pending = summary_queue.stats()['pending']
+        if not pending:
+            print("No laws waiting for a summary")
+            return
+        
+        print(f"Summarizing {pending if limit is None else min(pending, limit)} pending laws "
+              f"with {workers or summary_queue.workers} workers ({backend or Config.SUMMARIZER_BACKEND} backend)...")
+        counts = summary_queue.drain(limit=limit, workers=workers, backend=backend)
+        if counts is None:
+            print("Summary queue is already being drained")
+            return
+        
+        print(f"Done: {counts['done']} ({counts['cached']} from cache, {counts['cached_chunks']} cached chunks) | "
+              f"Failed: {counts['failed']} | "
+              f"Retried: {counts['retried']} | Superseded: {counts['superseded']} | {counts['seconds']}s")
+        
+        metrics = summarizer_metrics.snapshot()
+        if metrics['calls'] or metrics['fallbacks']:
+            latency = metrics['latency_seconds']
+            print(f"Groq: {metrics['calls']} calls | latency p50 <={latency['p50']}s p95 <={latency['p95']}s | "
+                  f"{metrics['tokens']['prompt']} prompt + {metrics['tokens']['completion']} completion tokens "
+                  f"(~${metrics['estimated_cost_usd']:.4f}) | retries {sum(metrics['retries'].values())} | "
+                  f"fallbacks {sum(metrics['fallbacks'].values())}")
+
+def summary_queue_status():
+    from src.summarizer.summary_queue import summary_queue
+    
+    with app.app_context():
+        stats = summary_queue.stats()
+        
+        print("\n" + "="*50)
+        print("Summary Queue")
+        print("="*50)
+        print(f"Pending: {stats['pending']} ({stats['waiting_retry']} waiting to retry) | "
+              f"Running: {stats['running']} | Done: {stats['done']} | "
+              f"Failed: {stats['failed']} | Superseded: {stats['superseded']}")
+        print(f"Oldest pending: {stats['oldest_pending_seconds']:.0f}s")
+        print(f"Last hour: {stats['completed_last_hour']} summaries ({stats['per_minute_last_hour']:.2f}/min), "
+              f"avg wait {stats['avg_wait_seconds']:.1f}s")
+        cache = stats['cache']
+        print(f"Cache: {cache['entries']} summaries, {cache['bytes'] / 2**20:.2f}/{cache['max_bytes'] / 2**20:.0f} MB, "
+              f"{cache['lifetime_hits']} hits served")
+        print("="*50 + "\n")
+
 def show_stats():
     with app.app_context():
         total_laws = LabourLaw.query.count()
@@ -105,30 +162,17 @@ def list_laws(limit=10):
             print(f"Updated: {law.updated_at}")
             print("-"*70)
 
-def search_laws(query, limit=5):
-    from src.embeddings.embedding_service import embedding_service
+def search_laws(query, limit=5, mode=None, filters=None):
+    from src.search.search_service import search_service
     
     with app.app_context():
-        query_embedding = embedding_service.generate_embedding(query)
+        matches = search_service.search(query, limit=limit, mode=mode, filters=filters)
         
-        if not query_embedding:
+        if matches is None:
             print("Failed to generate query embedding")
             return
         
-        laws = LabourLaw.query.all()
-        
-        results = []
-        for law in laws:
-            law_embedding = law.get_embedding()
-            if law_embedding:
-                similarity = embedding_service.calculate_similarity(
-                    query_embedding, law_embedding
-                )
-                if similarity > 0.3:
-                    results.append((law, similarity))
-        
-        results.sort(key=lambda x: x[1], reverse=True)
-        results = results[:limit]
+        results = search_service.load_laws(matches)
         
         print("\n" + "="*70)
         print(f"Search Results for: '{query}'")
@@ -138,15 +182,118 @@ def search_laws(query, limit=5):
             print("No matching laws found.")
             return
         
-        for law, score in results:
-            print(f"\nID: {law.id} | Similarity: {score:.4f}")
+        for law, score, passages in results:
+            print(f"\nID: {law.id} | Score: {score:.4f}")
             print(f"Title: {law.title[:60]}..." if len(law.title) > 60 else f"Title: {law.title}")
             print(f"Category: {law.category}")
+            if passages:
+                best = passages[0]
+                passage = law.content[best['start']:best['end']]
+                preview = passage[:200] + "..." if len(passage) > 200 else passage
+                print(f"Best passage (chars {best['start']}-{best['end']}): {preview}")
             if law.summary:
                 summary_preview = law.summary[:200] + "..." if len(law.summary) > 200 else law.summary
                 print(f"Summary: {summary_preview}")
             print("-"*70)
 
+def refit_embeddings(resume=None, chunk_size=None):
+    from src.embeddings.model_refit import (
+        create_reembed_job, find_resumable_job, run_reembed_job, REEMBED_CHUNK_SIZE
+    )
+    
+    with app.app_context():
+        if resume:
+            job = find_resumable_job(None if resume == 'latest' else resume)
+            if not job:
+                print("No resumable embedding job found")
+                return
+            print(f"Resuming embedding job {job.job_id} after law {job.last_law_id}")
+        else:
+            job = create_reembed_job()
+            print(f"Started embedding job {job.job_id}")
+        
+        version = run_reembed_job(job, chunk_size=chunk_size or REEMBED_CHUNK_SIZE)
+        
+        if not version:
+            print(f"Embedding job {job.job_id} did not complete: {job.error or 'see logs'}")
+            print(f"Resume with: python orchestrator.py refit-embeddings --resume {job.job_id}")
+            return
+        
+        print(f"Embedding model refitted: {version} ({job.processed} laws re-embedded)")
+
+def embedding_jobs():
+    from models import EmbeddingJob
+    
+    with app.app_context():
+        jobs = EmbeddingJob.query.order_by(EmbeddingJob.started_at.desc()).limit(10).all()
+        
+        if not jobs:
+            print("No embedding jobs yet.")
+            return
+        
+        print("\n" + "="*70)
+        print("EMBEDDING JOBS")
+        print("="*70)
+        for job in jobs:
+            info = job.to_dict()
+            print(f"{job.job_id} | {job.status:<9} | {job.target_version or '-'} | "
+                  f"{job.processed}/{job.total} ({info['progress']}%) | last id {job.last_law_id}")
+            if job.error:
+                print(f"    error: {job.error}")
+
+def index_passages():
+    from src.embeddings.passage_service import passage_service
+    
+    with app.app_context():
+        total = passage_service.backfill()
+        print(f"Indexed {total} passages")
+
+def ann_recall(queries=200, k=10, nprobe=None, min_score=0.0):
+    from src.search.ann_index import ann_index
+    
+    with app.app_context():
+        report = ann_index.evaluate_recall(sample_size=queries, k=k, nprobe=nprobe, min_score=min_score)
+        
+        if not report:
+            print("ANN index is not trained (not enough laws); searches use the exact index")
+            return
+        
+        print("\n" + "="*50)
+        print("ANN Recall vs Brute Force")
+        print("="*50)
+        print(f"Queries: {report['queries']}")
+        print(f"Lists: {report['lists']} | nprobe: {report['nprobe']} | k: {report['k']} | min score: {report['min_score']}")
+        print(f"Recall@{report['k']}: {report['recall']:.4f}")
+        print(f"ANN latency: {report['ann_ms_per_query']:.2f} ms/query")
+        print(f"Exact latency: {report['exact_ms_per_query']:.2f} ms/query")
+        print("="*50 + "\n")
+
+def quantization_recall(index='passages', queries=200, k=10, min_score=0.0):
+    from src.search.vector_index import vector_index
+    from src.search.passage_index import passage_index
+    
+    target = passage_index if index == 'passages' else vector_index
+    
+    with app.app_context():
+        report = target.evaluate_quantization(sample_size=queries, k=k, min_score=min_score)
+        
+        if not report:
+            print("No embeddings stored for the active model")
+            return
+        
+        timings = report['ms_per_query']
+        print("\n" + "="*50)
+        print(f"int8 Quantization vs Float ({report['index']})")
+        print("="*50)
+        print(f"Queries: {report['queries']} | k: {report['k']} | min score: {report['min_score']}")
+        print(f"Memory: float {report['float_bytes'] / 2**20:.2f} MB | int8 {report['int8_bytes'] / 2**20:.2f} MB "
+              f"({report['float_bytes'] / max(report['int8_bytes'], 1):.2f}x smaller)")
+        print(f"Recall@{report['k']} int8 scan only: {report['recall_int8']:.4f}")
+        print(f"Recall@{report['k']} int8 + exact re-rank (x{report['rerank_factor']}): {report['recall_int8_rerank']:.4f}")
+        print(f"Latency: float {timings['float']:.2f} | int8 {timings['int8']:.2f} | "
+              f"int8 + re-rank {timings['int8_rerank']:.2f} ms/query")
+        print("="*50 + "\n")
+
 def main():
     parser = argparse.ArgumentParser(
         description='Indian Labour Law AI Agent CLI'
@@ -155,6 +302,8 @@ def main():
     subparsers = parser.add_subparsers(dest='command', help='Commands')
     
     crawl_parser = subparsers.add_parser('crawl', help='Run a full crawl')
+    crawl_parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='SESSION_ID',
+                              help='Resume an interrupted crawl session (latest if no id is given)')
     
     url_parser = subparsers.add_parser('crawl-url', help='Crawl a single URL')
     url_parser.add_argument('url', help='URL to crawl')
@@ -167,13 +316,50 @@ def main():
     search_parser = subparsers.add_parser('search', help='Search laws')
     search_parser.add_argument('query', help='Search query')
     search_parser.add_argument('--limit', type=int, default=5, help='Number of results')
+    search_parser.add_argument('--mode', choices=['semantic', 'keyword', 'hybrid'], default=None,
+                               help='Ranking: embedding similarity, BM25 keyword match, or both fused')
+    search_parser.add_argument('--category', default=None, help='Only laws in this category (e.g. Act, Rule)')
+    search_parser.add_argument('--source', default=None, help='Only laws from this source')
+    search_parser.add_argument('--language', default=None, help='Only laws in this language code (e.g. en)')
+    search_parser.add_argument('--date-from', default=None, help='Published on or after YYYY-MM-DD')
+    search_parser.add_argument('--date-to', default=None, help='Published on or before YYYY-MM-DD')
+    
+    refit_parser = subparsers.add_parser('refit-embeddings', help='Refit the embedding model and re-embed all laws')
+    refit_parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='JOB_ID',
+                              help='Resume an interrupted job (latest if no id is given)')
+    refit_parser.add_argument('--chunk-size', type=int, default=None, help='Laws embedded per batch')
+    
+    jobs_parser = subparsers.add_parser('embedding-jobs', help='Show recent re-embedding jobs')
+    
+    passages_parser = subparsers.add_parser('index-passages', help='Chunk and embed laws that have no passages yet')
+    
+    recall_parser = subparsers.add_parser('ann-recall', help='Report ANN index recall against brute force')
+    recall_parser.add_argument('--queries', type=int, default=200, help='Number of sampled queries')
+    recall_parser.add_argument('--k', type=int, default=10, help='Neighbours per query')
+    recall_parser.add_argument('--nprobe', type=int, default=None, help='Inverted lists probed per query')
+    recall_parser.add_argument('--min-score', type=float, default=0.0, help='Only count neighbours above this similarity')
+    
+    quant_parser = subparsers.add_parser('quantization-recall', help='Compare int8 index recall and memory with float')
+    quant_parser.add_argument('--index', choices=['passages', 'laws'], default='passages', help='Index to evaluate')
+    quant_parser.add_argument('--queries', type=int, default=200, help='Number of sampled queries')
+    quant_parser.add_argument('--k', type=int, default=10, help='Neighbours per query')
+    quant_parser.add_argument('--min-score', type=float, default=0.0, help='Only count neighbours above this similarity')
+    
+    summarize_parser = subparsers.add_parser('summarize-pending', help='Summarize laws waiting in the summary queue')
+    summarize_parser.add_argument('--limit', type=int, default=None, help='Maximum number of laws to summarize')
+    summarize_parser.add_argument('--workers', type=int, default=None, help='Concurrent summarizer requests')
+    summarize_parser.add_argument('--backend', choices=['groq', 'extractive'], default=None,
+                                  help='Summarizer to use instead of SUMMARIZER_BACKEND')
+    
+    queue_parser = subparsers.add_parser('summary-queue', help='Show the summary queue backlog and throughput')
     
     server_parser = subparsers.add_parser('server', help='Start the web server')
     
     args = parser.parse_args()
+    init_db()
     
     if args.command == 'crawl':
-        run_crawl()
+        run_crawl(args.resume)
     elif args.command == 'crawl-url':
         crawl_url(args.url)
     elif args.command == 'stats':
@@ -181,7 +367,26 @@ def main():
     elif args.command == 'list':
         list_laws(args.limit)
     elif args.command == 'search':
-        search_laws(args.query, args.limit)
+        from src.search.filters import SearchFilters
+        try:
+            filters = SearchFilters(args.category, args.source, args.language, args.date_from, args.date_to)
+        except ValueError as e:
+            parser.error(str(e))
+        search_laws(args.query, args.limit, args.mode, filters)
+    elif args.command == 'refit-embeddings':
+        refit_embeddings(args.resume, args.chunk_size)
+    elif args.command == 'embedding-jobs':
+        embedding_jobs()
+    elif args.command == 'index-passages':
+        index_passages()
+    elif args.command == 'ann-recall':
+        ann_recall(args.queries, args.k, args.nprobe, args.min_score)
+    elif args.command == 'quantization-recall':
+        quantization_recall(args.index, args.queries, args.k, args.min_score)
+    elif args.command == 'summarize-pending':
+        summarize_pending(args.limit, args.workers, args.backend)
+    elif args.command == 'summary-queue':
+        summary_queue_status()
     elif args.command == 'server':
         print("Starting web server...")
         app.run(host='0.0.0.0', port=5000, debug=True)
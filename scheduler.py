@@ -1,11 +1,13 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 import atexit
 from src.crawler.web_crawler import web_crawler
-from src.database.upsert_service import upsert_service
+from src.database.crawl_sessions import run_crawl_session
 from src.utils.logger import logger
-from main import app
+from main import app, init_db
+from config.settings import Config
 
 scheduler = BackgroundScheduler()
 
@@ -14,10 +16,9 @@ def scheduled_crawl():
     
     try:
         with app.app_context():
-            items = web_crawler.crawl_all()
+            result = run_crawl_session(web_crawler)
             
-            if items:
-                result = upsert_service.process_batch(items)
+            if result['stats']['total']:
                 logger.info(f"Scheduled crawl completed: {result}")
             else:
                 logger.warning("Scheduled crawl: No items found")
@@ -25,6 +26,27 @@ def scheduled_crawl():
     except Exception as e:
         logger.error(f"Scheduled crawl failed: {e}")
 
+def scheduled_summaries():
+    from src.summarizer.summary_queue import summary_queue
+    
+    try:
+        with app.app_context():
+            summary_queue.drain()
+    except Exception as e:
+        logger.error(f"Scheduled summary drain failed: {e}")
+
+def scheduled_refit():
+    from src.embeddings.model_refit import refit_embedding_model
+    
+    logger.info(f"Scheduled embedding refit started at {datetime.utcnow().isoformat()}")
+    
+    try:
+        with app.app_context():
+            version = refit_embedding_model()
+            logger.info(f"Scheduled embedding refit completed: {version}")
+    except Exception as e:
+        logger.error(f"Scheduled embedding refit failed: {e}")
+
 def start_scheduler():
     scheduler.add_job(
         scheduled_crawl,
@@ -34,6 +56,26 @@ def start_scheduler():
         replace_existing=True
     )
     
+    scheduler.add_job(
+        scheduled_summaries,
+        trigger=IntervalTrigger(minutes=Config.SUMMARY_DRAIN_MINUTES),
+        id='summary_queue_drain',
+        name='Summary Queue Drain',
+        replace_existing=True
+    )
+    
+    scheduler.add_job(
+        scheduled_refit,
+        trigger=CronTrigger(
+            day_of_week=Config.EMBEDDING_REFIT_DAY,
+            hour=Config.EMBEDDING_REFIT_HOUR,
+            minute=0
+        ),
+        id='weekly_embedding_refit',
+        name='Weekly Embedding Model Refit',
+        replace_existing=True
+    )
+    
     scheduler.start()
     logger.info("Scheduler started - Daily crawl scheduled for 2:00 AM UTC")
     
@@ -47,6 +89,7 @@ def stop_scheduler():
         logger.info("Scheduler stopped")
 
 if __name__ == '__main__':
+    init_db()
     start_scheduler()
     
     try:
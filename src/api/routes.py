@@ -2,10 +2,18 @@ from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
 import threading
 from src.database.db import db
-from models import LabourLaw, AuditLog, CrawlSession
+from config.settings import Config
+from models import LabourLaw, AuditLog, CrawlSession, EmbeddingJob
 from src.embeddings.embedding_service import embedding_service
+from src.search.search_service import search_service, SEARCH_MODES
+from src.search.filters import SearchFilters
 from src.crawler.web_crawler import web_crawler
 from src.database.upsert_service import upsert_service
+from src.database.crawl_sessions import run_crawl_session
+from src.database.law_history import law_history
+from src.summarizer.summary_queue import summary_queue
+from src.summarizer.groq_summarizer import groq_summarizer
+from src.summarizer.metrics import summarizer_metrics
 from src.utils.logger import logger
 
 api_bp = Blueprint('api', __name__)
@@ -27,7 +35,8 @@ def get_stats():
         return jsonify({
             'total_laws': total_laws,
             'total_sessions': total_sessions,
-            'last_crawl': last_crawl
+            'last_crawl': last_crawl,
+            'search_cache': search_service.cache_stats()
         })
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
@@ -74,40 +83,105 @@ def get_law(law_id):
         logger.error(f"Error getting law {law_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/laws/<int:law_id>/versions', methods=['GET'])
+def get_law_versions(law_id):
+    try:
+        law = LabourLaw.query.get(law_id)
+        
+        if not law:
+            return jsonify({'error': 'Law not found'}), 404
+        
+        return jsonify({
+            'law_id': law_id,
+            'current_version': law.version,
+            'versions': [version.to_dict() for version in law_history.versions(law_id)]
+        })
+    except Exception as e:
+        logger.error(f"Error getting versions of law {law_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/laws/<int:law_id>/versions/<int:version>', methods=['GET'])
+def get_law_version(law_id, version):
+    try:
+        law = LabourLaw.query.get(law_id)
+        
+        if not law:
+            return jsonify({'error': 'Law not found'}), 404
+        
+        result = law_history.reconstruct(law, version)
+        if not result:
+            return jsonify({'error': f'Version {version} is not recorded'}), 404
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error reconstructing version {version} of law {law_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/laws/<int:law_id>/diff', methods=['GET'])
+def get_law_diff(law_id):
+    try:
+        law = LabourLaw.query.get(law_id)
+        
+        if not law:
+            return jsonify({'error': 'Law not found'}), 404
+        
+        to_version = request.args.get('to', law.version, type=int)
+        from_version = request.args.get('from', to_version - 1, type=int)
+        context = request.args.get('context', 3, type=int)
+        
+        result = law_history.diff(law, from_version, to_version, context)
+        if not result:
+            return jsonify({'error': f'Version {from_version} or {to_version} is not recorded'}), 404
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error diffing law {law_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @api_bp.route('/laws/search', methods=['POST'])
 def search_laws():
     try:
         data = request.get_json()
         query = data.get('query', '')
         limit = data.get('limit', 10)
+        mode = data.get('mode', Config.SEARCH_DEFAULT_MODE)
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
-        query_embedding = embedding_service.generate_embedding(query)
+        if mode not in SEARCH_MODES:
+            return jsonify({'error': f"Invalid mode, expected one of: {', '.join(SEARCH_MODES)}"}), 400
         
-        if not query_embedding:
-            return jsonify({'error': 'Failed to generate query embedding'}), 500
+        try:
+            filters = SearchFilters(
+                category=data.get('category'),
+                source=data.get('source'),
+                language=data.get('language'),
+                date_from=data.get('date_from'),
+                date_to=data.get('date_to')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        laws = LabourLaw.query.all()
+        matches = search_service.search(query, limit=limit, mode=mode, filters=filters)
+        
+        if matches is None:
+            return jsonify({'error': 'Failed to generate query embedding'}), 500
         
         results = []
-        for law in laws:
-            law_embedding = law.get_embedding()
-            if law_embedding:
-                similarity = embedding_service.calculate_similarity(
-                    query_embedding, law_embedding
-                )
-                if similarity > 0.3:
-                    result = law.to_dict()
-                    result['similarity_score'] = round(similarity, 4)
-                    results.append(result)
-        
-        results.sort(key=lambda x: x['similarity_score'], reverse=True)
-        results = results[:limit]
+        for law, score, passages in search_service.load_laws(matches):
+            result = law.to_dict()
+            result['similarity_score'] = round(score, 4)
+            result['passages'] = [
+                {'start': p['start'], 'end': p['end'], 'score': round(p['score'], 4)}
+                for p in passages
+            ]
+            results.append(result)
         
         return jsonify({
             'query': query,
+            'mode': mode,
+            'filters': filters.to_dict(),
             'results': results,
             'total': len(results)
         })
@@ -123,9 +197,8 @@ def start_crawl():
         def run_crawl():
             with app.app_context():
                 logger.info("Starting crawl job...")
-                items = web_crawler.crawl_all()
-                if items:
-                    result = upsert_service.process_batch(items)
+                result = run_crawl_session(web_crawler, summarize=summary_queue.drain)
+                if result['stats']['total']:
                     logger.info(f"Crawl completed: {result}")
                 else:
                     logger.warning("No items found during crawl")
@@ -171,6 +244,7 @@ def crawl_single_url():
             return jsonify({'error': 'Failed to fetch URL'}), 400
         
         result = upsert_service.process_batch([item])
+        _start_summary_drain()
         
         return jsonify({
             'message': 'URL processed successfully',
@@ -180,6 +254,146 @@ def crawl_single_url():
         logger.error(f"Error crawling URL: {e}")
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/embeddings/model', methods=['GET'])
+def embedding_model_info():
+    try:
+        active_version = embedding_service.active_version
+        by_version = db.session.query(
+            LabourLaw.embedding_version,
+            db.func.count(LabourLaw.id)
+        ).group_by(LabourLaw.embedding_version).all()
+        
+        return jsonify({
+            'active_version': active_version,
+            'backend': embedding_service.backend,
+            'fitted': embedding_service.model_version is not None,
+            'laws_by_version': {version or 'none': count for version, count in by_version}
+        })
+    except Exception as e:
+        logger.error(f"Error getting embedding model info: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/embeddings/refit', methods=['POST'])
+def refit_embeddings():
+    try:
+        from src.embeddings.model_refit import create_reembed_job
+        
+        job = create_reembed_job()
+        _start_embedding_job(job.job_id)
+        
+        return jsonify({
+            'message': 'Embedding model refit started in background',
+            'status': 'running',
+            'job_id': job.job_id
+        })
+    except Exception as e:
+        logger.error(f"Error starting embedding refit: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _start_embedding_job(job_id):
+    from main import app
+    from src.embeddings.model_refit import run_reembed_job
+    
+    def run_job():
+        with app.app_context():
+            job = EmbeddingJob.query.filter_by(job_id=job_id).first()
+            version = run_reembed_job(job)
+            logger.info(f"Embedding job {job_id} finished: {version}")
+    
+    thread = threading.Thread(target=run_job)
+    thread.start()
+
+@api_bp.route('/embeddings/jobs', methods=['GET'])
+def get_embedding_jobs():
+    try:
+        jobs = EmbeddingJob.query.order_by(EmbeddingJob.started_at.desc()).limit(20).all()
+        return jsonify({'jobs': [job.to_dict() for job in jobs]})
+    except Exception as e:
+        logger.error(f"Error getting embedding jobs: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/embeddings/jobs/<job_id>', methods=['GET'])
+def get_embedding_job(job_id):
+    try:
+        job = EmbeddingJob.query.filter_by(job_id=job_id).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict())
+    except Exception as e:
+        logger.error(f"Error getting embedding job {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/embeddings/jobs/<job_id>/resume', methods=['POST'])
+def resume_embedding_job(job_id):
+    try:
+        from src.embeddings.model_refit import find_resumable_job
+        
+        job = find_resumable_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found, already completed, or still running'}), 409
+        
+        _start_embedding_job(job.job_id)
+        
+        return jsonify({
+            'message': f'Embedding job resumed after law {job.last_law_id}',
+            'status': 'running',
+            'job_id': job.job_id
+        })
+    except Exception as e:
+        logger.error(f"Error resuming embedding job {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/summaries/queue', methods=['GET'])
+def get_summary_queue():
+    try:
+        return jsonify(summary_queue.stats())
+    except Exception as e:
+        logger.error(f"Error getting summary queue stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/summaries/drain', methods=['POST'])
+def drain_summary_queue():
+    try:
+        _start_summary_drain()
+        
+        return jsonify({
+            'message': 'Summary queue drain started in background',
+            'status': 'running',
+            'pending': summary_queue.stats()['pending']
+        })
+    except Exception as e:
+        logger.error(f"Error starting summary drain: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/summarizer/metrics', methods=['GET'])
+def summarizer_metrics_info():
+    try:
+        return jsonify({
+            'backend': Config.SUMMARIZER_BACKEND,
+            'model': groq_summarizer.model,
+            'groq_available': groq_summarizer.available,
+            'limits': {
+                'requests_per_minute': Config.GROQ_REQUESTS_PER_MINUTE,
+                'tokens_per_minute': Config.GROQ_TOKENS_PER_MINUTE
+            },
+            'limiter_waited_seconds': round(groq_summarizer.limiter.waited_seconds, 2),
+            'limiter_rate_factor': round(groq_summarizer.limiter.rate_factor, 3),
+            **summarizer_metrics.snapshot()
+        })
+    except Exception as e:
+        logger.error(f"Error getting summarizer metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _start_summary_drain():
+    from main import app
+    
+    def run_drain():
+        with app.app_context():
+            summary_queue.drain()
+    
+    thread = threading.Thread(target=run_drain)
+    thread.start()
+
 @api_bp.route('/logs', methods=['GET'])
 def get_logs():
     try:
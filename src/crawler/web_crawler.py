@@ -152,68 +152,81 @@ class WebCrawler:
             logger.error(f"Error extracting links from {base_url}: {e}")
             return []
     
-    def crawl_source(self, source):
-        results = []
-        
-        logger.info(f"Crawling source: {source['name']}")
+    def expand_source(self, source):
+        if source['type'] != 'index':
+            return [{'url': source['url'], 'source': source['name'], 'title': None, 'is_pdf': False}]
         
         page_result = self.fetch_page(source['url'])
         
         if not page_result['success']:
             logger.error(f"Failed to fetch {source['url']}: {page_result.get('error')}")
-            return results
+            return None
         
-        if source['type'] == 'index':
-            links = self.extract_links(page_result['content'], source['url'])
-            logger.info(f"Found {len(links)} relevant links from {source['name']}")
-            
-            for link in links[:20]:
-                if link['is_pdf']:
-                    results.append({
-                        'url': link['url'],
-                        'title': link['text'],
-                        'content': f"[PDF Document] {link['text']}",
-                        'source': source['name'],
-                        'is_pdf': True
-                    })
-                else:
-                    sub_result = self.fetch_page(link['url'])
-                    if sub_result['success']:
-                        content = self.extract_content(sub_result['content'], link['url'])
-                        if content and len(content) > 100:
-                            results.append({
-                                'url': link['url'],
-                                'html': sub_result['content'],
-                                'content': content,
-                                'source': source['name'],
-                                'is_pdf': False
-                            })
-        else:
-            content = self.extract_content(page_result['content'], source['url'])
-            if content and len(content) > 100:
-                results.append({
-                    'url': source['url'],
-                    'html': page_result['content'],
-                    'content': content,
-                    'source': source['name'],
-                    'is_pdf': False
-                })
+        links = self.extract_links(page_result['content'], source['url'])
+        logger.info(f"Found {len(links)} relevant links from {source['name']}")
         
-        return results
+        return [
+            {'url': link['url'], 'source': source['name'], 'title': link['text'], 'is_pdf': link['is_pdf']}
+            for link in links[:20]
+        ]
     
-    def crawl_all(self):
-        all_results = []
+    def fetch_entry(self, entry):
+        if entry['is_pdf']:
+            return {
+                'url': entry['url'],
+                'title': entry['title'],
+                'content': f"[PDF Document] {entry['title']}",
+                'source': entry['source'],
+                'is_pdf': True
+            }
+        
+        result = self.fetch_page(entry['url'])
+        if not result['success']:
+            return None
+        
+        content = self.extract_content(result['content'], entry['url'])
+        if not content or len(content) <= 100:
+            return None
+        
+        return {
+            'url': entry['url'],
+            'html': result['content'],
+            'content': content,
+            'source': entry['source'],
+            'is_pdf': False
+        }
+    
+    def iter_entries(self, entries):
+        for entry in entries:
+            item = self.fetch_entry(entry)
+            if item:
+                yield item
+    
+    def iter_source(self, source):
+        logger.info(f"Crawling source: {source['name']}")
+        yield from self.iter_entries(self.expand_source(source) or [])
+    
+    def crawl_source(self, source):
+        return list(self.iter_source(source))
+    
+    def iter_crawl(self):
+        total = 0
         
         for source in self.SOURCES:
+            count = 0
             try:
-                results = self.crawl_source(source)
-                all_results.extend(results)
-                logger.info(f"Collected {len(results)} items from {source['name']}")
+                for item in self.iter_source(source):
+                    count += 1
+                    yield item
+                logger.info(f"Collected {count} items from {source['name']}")
             except Exception as e:
                 logger.error(f"Error crawling {source['name']}: {e}")
+            total += count
         
-        logger.info(f"Total items crawled: {len(all_results)}")
-        return all_results
+        logger.info(f"Total items crawled: {total}")
+    
+    def crawl_all(self):
+        return list(self.iter_crawl())
     
     def crawl_url(self, url):
         result = self.fetch_page(url)
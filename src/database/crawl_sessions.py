@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from src.database.db import db
+from src.database.upsert_service import upsert_service
+from models import CrawlSession, CrawlFrontier
+from src.summarizer.metrics import summarizer_metrics
+from src.utils.logger import logger
+
+SESSION_STALE_SECONDS = 1800
+
+def _is_stale(session):
+    heartbeat = session.heartbeat_at or session.started_at
+    return heartbeat is None or datetime.utcnow() - heartbeat >= timedelta(seconds=SESSION_STALE_SECONDS)
+
+def _has_frontier(session_id):
+    return db.session.query(CrawlFrontier.id).filter_by(crawl_session_id=session_id).first() is not None
+
+def _heartbeat(session):
+    session.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+def _frontier(session_id, kind, status='pending'):
+    return CrawlFrontier.query.filter_by(
+        crawl_session_id=session_id, kind=kind, status=status
+    ).order_by(CrawlFrontier.id)
+
+def start_crawl_session(crawler):
+    session_id = upsert_service.create_session()
+    
+    db.session.execute(insert(CrawlFrontier), [{
+        'crawl_session_id': session_id,
+        'kind': 'index' if source['type'] == 'index' else 'page',
+        'url': source['url'],
+        'source': source['name'],
+        'is_pdf': False,
+        'status': 'pending'
+    } for source in crawler.SOURCES])
+    db.session.commit()
+    
+    return CrawlSession.query.filter_by(session_id=session_id).first()
+
+def find_resumable_session(session_id=None):
+    query = CrawlSession.query.filter(CrawlSession.status.in_(['running', 'interrupted']))
+    if session_id:
+        query = query.filter_by(session_id=session_id)
+    session = query.order_by(CrawlSession.started_at.desc()).first()
+    
+    if not session:
+        return None
+    
+    if session.status == 'running' and not _is_stale(session):
+        logger.warning(f"Crawl session {session.session_id} is still running (last heartbeat {session.heartbeat_at})")
+        return None
+    
+    if not _has_frontier(session.session_id):
+        logger.warning(f"Crawl session {session.session_id} has no saved frontier and cannot be resumed")
+        return None
+    
+    return session
+
+def close_stale_sessions():
+    now = datetime.utcnow()
+    closed = 0
+    
+    sessions = CrawlSession.query.filter(
+        CrawlSession.status.in_(['running', 'interrupted'])
+    ).order_by(CrawlSession.started_at.desc()).all()
+    
+    for session in sessions:
+        if session.status == 'running' and not _is_stale(session):
+            continue
+        
+        logger.warning(f"Closing abandoned crawl session {session.session_id} "
+                       f"(status {session.status}, last heartbeat {session.heartbeat_at})")
+        session.status = 'abandoned'
+        session.completed_at = now
+        closed += 1
+    
+    db.session.commit()
+    return closed
+
+def _expand_sources(session, crawler):
+    sources = {source['url']: source for source in crawler.SOURCES}
+    
+    for row in _frontier(session.session_id, 'index').all():
+        source = sources.get(row.url, {'name': row.source, 'url': row.url, 'type': 'index'})
+        logger.info(f"Crawling source: {source['name']}")
+        entries = crawler.expand_source(source)
+        
+        if entries is None:
+            row.status = 'failed'
+            _heartbeat(session)
+            continue
+        
+        seen = {url for (url,) in db.session.query(CrawlFrontier.url).filter_by(
+            crawl_session_id=session.session_id, kind='page'
+        )}
+        new_entries = []
+        for entry in entries:
+            if entry['url'] not in seen:
+                seen.add(entry['url'])
+                new_entries.append(dict(
+                    entry,
+                    title=(entry['title'] or '')[:500] or None,
+                    crawl_session_id=session.session_id,
+                    kind='page',
+                    status='pending'
+                ))
+        
+        if new_entries:
+            db.session.execute(insert(CrawlFrontier), new_entries)
+        row.status = 'done'
+        _heartbeat(session)
+
+def record_summarizer_stats(session_id, since):
+    try:
+        session = CrawlSession.query.filter_by(session_id=session_id).first()
+        if session:
+            session.set_summarizer_stats(summarizer_metrics.snapshot(since=since))
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to record summarizer stats for crawl session {session_id}: {e}")
+
+def run_crawl_session(crawler, resume=None, summarize=None):
+    if resume:
+        session = find_resumable_session(None if resume == 'latest' else resume)
+        if not session:
+            return None
+    else:
+        # A plain crawl always expands the sources afresh; leftover sessions are only
+        # resumed when asked for with --resume.
+        close_stale_sessions()
+        session = start_crawl_session(crawler)
+    
+    session_id = session.session_id
+    if session.status != 'running' or _is_stale(session):
+        logger.info(f"Resuming crawl session {session_id} "
+                    f"({_frontier(session_id, 'page').count()} pages left in frontier)")
+    
+    session.status = 'running'
+    _heartbeat(session)
+    
+    since = summarizer_metrics.mark()
+    try:
+        try:
+            _expand_sources(session, crawler)
+            entries = [row.to_entry() for row in _frontier(session_id, 'page')]
+            # Items are streamed as they are fetched, but the frontier already lists every
+            # URL, so existing laws are looked up in chunks rather than one query per page.
+            known_urls = upsert_service.prefetch_existing(entry['url'] for entry in entries)
+            result = upsert_service.process_batch(
+                crawler.iter_entries(entries), session_id=session_id, known_urls=known_urls
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Crawl session {session_id} interrupted: {e}")
+            session.status = 'interrupted'
+            _heartbeat(session)
+            raise
+        
+        failed = CrawlFrontier.query.filter_by(
+            crawl_session_id=session_id, kind='page', status='pending'
+        ).update({'status': 'failed'}, synchronize_session=False)
+        db.session.commit()
+        if failed:
+            logger.info(f"Crawl session {session_id}: {failed} pages could not be fetched")
+        
+        if summarize:
+            summarize()
+        
+        return result
+    finally:
+        record_summarizer_stats(session_id, since)
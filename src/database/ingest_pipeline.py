@@ -0,0 +1,168 @@
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from config.settings import Config
+from src.embeddings.embedding_service import embedding_service
+from src.preprocessor.text_processor import text_processor
+from src.utils.logger import logger
+
+INLINE_MAX_ITEMS = 2
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+def prepare_item(item, known_hash=None):
+    html = item.get('html', item.get('content', ''))
+    cleaned_text, content_hash = text_processor.fingerprint(html)
+    if known_hash is not None and known_hash == content_hash:
+        return None
+    
+    processed = text_processor.process(html, item.get('url', ''), cleaned_text=cleaned_text, content_hash=content_hash)
+    
+    embedded = None
+    if len(processed['content']) >= 100:
+        embedded = embedding_service.embed(processed['content'])
+    return processed, embedded
+
+def _process_pool(workers):
+    # One pool per process, kept across batches. Its workers are forked from a
+    # single-threaded server process (the web app and scheduler run threads of their
+    # own) and only started as batches need them, so a small batch starts only a few.
+    with _process_pools_lock:
+        pool = _process_pools.get(workers)
+        if pool is None or pool._broken:
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload([__name__])
+            pool = _process_pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return pool
+
+class _InlineExecutor:
+    
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+class IngestPipeline:
+    
+    def __init__(self, upsert, cpu_workers=None, queue_size=None):
+        self.upsert = upsert
+        self.cpu_workers = Config.PIPELINE_CPU_WORKERS if cpu_workers is None else cpu_workers
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+    
+    def _cpu_pool(self, items):
+        # A crawl streams its items, but the single-page endpoints pass a list of one:
+        # those are prepared in this thread instead of waiting on a worker.
+        sized = isinstance(items, (list, tuple))
+        if sized and len(items) <= INLINE_MAX_ITEMS:
+            return _InlineExecutor(), False
+        
+        if self.cpu_workers > 0 and 'forkserver' in multiprocessing.get_all_start_methods():
+            return _process_pool(self.cpu_workers), True
+        
+        workers = min(max(1, self.cpu_workers), len(items)) if sized else max(1, self.cpu_workers)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest-cpu'), False
+    
+    def run(self, items, session_id, known_urls, uow):
+        events = queue.Queue(maxsize=self.queue_size + 1)
+        slots = threading.BoundedSemaphore(self.queue_size)
+        stop = threading.Event()
+        
+        cpu_pool, shared = self._cpu_pool(items)
+        submitted = set()
+        
+        def feed():
+            count = 0
+            try:
+                for item in items:
+                    slots.acquire()
+                    if stop.is_set():
+                        return
+                    events.put(('crawled', item, None, None))
+                    count += 1
+            except Exception as e:
+                logger.error(f"Ingest feeder stopped early: {e}")
+            finally:
+                if not stop.is_set():
+                    events.put(('end', None, count, None))
+        
+        feeder = threading.Thread(target=feed, name='ingest-feeder', daemon=True)
+        feeder.start()
+        
+        logger.info(f"Ingest pipeline started: {type(cpu_pool).__name__}, queue size {self.queue_size}")
+        
+        total = None
+        done = 0
+        try:
+            while total is None or done < total:
+                stage, item, payload, future = events.get()
+                
+                if stage == 'end':
+                    total = payload
+                    continue
+                
+                if stage == 'crawled':
+                    result = self._on_crawled(item, session_id, known_urls, uow, cpu_pool, events, submitted)
+                else:
+                    result = self._on_prepared(item, payload, future, session_id, known_urls, uow)
+                
+                if result is None:
+                    continue
+                
+                done += 1
+                slots.release()
+                logger.info(f"Processed item {done}: {item.get('url', 'unknown')} ({result})")
+                yield item, result
+        finally:
+            stop.set()
+            for _ in range(self.queue_size):
+                try:
+                    slots.release()
+                except ValueError:
+                    break
+            if shared:
+                for future in list(submitted):
+                    future.cancel()
+            else:
+                cpu_pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _fail(self, item, session_id, uow, error):
+        url = item.get('url', '')
+        logger.error(f"Error processing item {url}: {error}")
+        self.upsert.log_plan(uow, session_id, url, item.get('source', 'Unknown'), ('error', None, str(error), None))
+        return 'error'
+    
+    def _on_crawled(self, item, session_id, known_urls, uow, cpu_pool, events, submitted):
+        try:
+            known = self.upsert.lookup_existing(item.get('url', ''), known_urls)
+            future = cpu_pool.submit(prepare_item, item, known[1] if known else None)
+        except Exception as e:
+            return self._fail(item, session_id, uow, e)
+        
+        submitted.add(future)
+        future.add_done_callback(submitted.discard)
+        future.add_done_callback(lambda f: events.put(('prepared', item, known, f)))
+        return None
+    
+    def _on_prepared(self, item, known, future, session_id, known_urls, uow):
+        url = item.get('url', '')
+        source = item.get('source', 'Unknown')
+        item.pop('html', None)
+        item.pop('content', None)
+        
+        try:
+            prepared = future.result()
+        except Exception as e:
+            return self._fail(item, session_id, uow, e)
+        
+        if prepared is None:
+            return self.upsert.log_plan(uow, session_id, url, source, ('skip', known[0], 'Content unchanged (same hash)', None))
+        
+        return self.upsert.process_item(item, session_id, known_urls=known_urls, uow=uow, prepared=prepared)
@@ -0,0 +1,177 @@
+import difflib
+import json
+import re
+import zlib
+from sqlalchemy import func, update
+from sqlalchemy.orm import defer
+from src.database.db import db
+from models import LawVersion
+from config.settings import Config
+
+SEGMENT_BOUNDARY = re.compile(r'(?<=\n)|(?<=[.;:] )')
+
+def segments(text):
+    return [segment for segment in SEGMENT_BOUNDARY.split(text) if segment]
+
+def encode_delta(old, new):
+    old_lines = segments(old)
+    new_lines = segments(new)
+    
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(new_lines[j1:j2])
+    
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+def apply_delta(old, data):
+    old_lines = segments(old)
+    
+    parts = []
+    for op in json.loads(zlib.decompress(data).decode('utf-8')):
+        if op and isinstance(op[0], int):
+            parts.extend(old_lines[op[0]:op[1]])
+        else:
+            parts.extend(op)
+    
+    return ''.join(parts)
+
+def encode_snapshot(content):
+    return zlib.compress(content.encode('utf-8'))
+
+def decode_snapshot(data):
+    return zlib.decompress(data).decode('utf-8')
+
+class LawHistory:
+    
+    def __init__(self, snapshot_interval=None):
+        self.snapshot_interval = snapshot_interval or Config.LAW_VERSION_SNAPSHOT_INTERVAL
+    
+    def capture(self, law):
+        return {
+            'version': law.version,
+            'title': law.title,
+            'content': law.content,
+            'summary': law.summary,
+            'content_hash': law.content_hash,
+            'updated_at': law.updated_at
+        }
+    
+    def record(self, law, previous):
+        last_snapshot = db.session.query(func.max(LawVersion.version)).filter(
+            LawVersion.law_id == law.id,
+            LawVersion.kind == 'snapshot'
+        ).scalar()
+        
+        if last_snapshot is None:
+            db.session.add(LawVersion(
+                law_id=law.id,
+                version=previous['version'],
+                kind='snapshot',
+                data=encode_snapshot(previous['content']),
+                title=previous['title'],
+                summary=previous['summary'],
+                content_hash=previous['content_hash'],
+                created_at=previous['updated_at']
+            ))
+            last_snapshot = previous['version']
+        else:
+            db.session.execute(
+                update(LawVersion).where(
+                    LawVersion.law_id == law.id,
+                    LawVersion.version == previous['version']
+                ).values(summary=previous['summary'])
+            )
+        
+        snapshot = encode_snapshot(law.content)
+        kind, data = 'snapshot', snapshot
+        if law.version - last_snapshot < self.snapshot_interval:
+            delta = encode_delta(previous['content'], law.content)
+            if len(delta) < len(snapshot):
+                kind, data = 'delta', delta
+        
+        db.session.add(LawVersion(
+            law_id=law.id,
+            version=law.version,
+            kind=kind,
+            data=data,
+            title=law.title,
+            content_hash=law.content_hash,
+            created_at=law.updated_at
+        ))
+    
+    def versions(self, law_id):
+        return LawVersion.query.options(defer(LawVersion.data)).filter_by(
+            law_id=law_id
+        ).order_by(LawVersion.version).all()
+    
+    def reconstruct(self, law, version):
+        if version == law.version:
+            return {
+                'law_id': law.id,
+                'version': law.version,
+                'title': law.title,
+                'content': law.content,
+                'summary': law.summary,
+                'content_hash': law.content_hash
+            }
+        
+        base = LawVersion.query.filter(
+            LawVersion.law_id == law.id,
+            LawVersion.kind == 'snapshot',
+            LawVersion.version <= version
+        ).order_by(LawVersion.version.desc()).first()
+        
+        if base is None:
+            return None
+        
+        chain = LawVersion.query.filter(
+            LawVersion.law_id == law.id,
+            LawVersion.version > base.version,
+            LawVersion.version <= version
+        ).order_by(LawVersion.version).all()
+        
+        content = decode_snapshot(base.data)
+        row = base
+        for row in chain:
+            content = apply_delta(content, row.data)
+        
+        if row.version != version:
+            return None
+        
+        return {
+            'law_id': law.id,
+            'version': row.version,
+            'title': row.title,
+            'content': content,
+            'summary': row.summary,
+            'content_hash': row.content_hash
+        }
+    
+    def diff(self, law, from_version, to_version, context=3):
+        old = self.reconstruct(law, from_version)
+        new = self.reconstruct(law, to_version)
+        if old is None or new is None:
+            return None
+        
+        lines = list(difflib.unified_diff(
+            [segment.rstrip('\n') + '\n' for segment in segments(old['content'])],
+            [segment.rstrip('\n') + '\n' for segment in segments(new['content'])],
+            fromfile=f'v{from_version}',
+            tofile=f'v{to_version}',
+            n=context
+        ))
+        
+        return {
+            'law_id': law.id,
+            'from_version': from_version,
+            'to_version': to_version,
+            'added': sum(1 for line in lines if line.startswith('+') and not line.startswith('+++')),
+            'removed': sum(1 for line in lines if line.startswith('-') and not line.startswith('---')),
+            'diff': ''.join(lines)
+        }
+
+law_history = LawHistory()
@@ -0,0 +1,160 @@
+from sqlalchemy import inspect, text, bindparam, update, LargeBinary
+from config.settings import Config
+from src.database.db import db
+from models import LabourLaw
+from src.embeddings import sparse as sparse_embeddings
+from src.preprocessor.minhash import minhasher
+from src.utils.logger import logger
+import numpy as np
+import json
+
+EMBEDDING_MIGRATION_CHUNK_SIZE = 500
+
+def add_missing_columns():
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        
+        existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+        
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            logger.info(f"Migrating {table.name}: adding column {column.name} ({column_type})")
+            db.session.execute(text(
+                f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            ))
+        
+        existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                logger.info(f"Migrating {table.name}: creating index {index.name}")
+                index.create(bind=db.session.connection())
+    
+    db.session.commit()
+
+def migrate_embeddings_to_binary():
+    inspector = inspect(db.engine)
+    if 'labour_laws' not in inspector.get_table_names():
+        return 0
+    
+    columns = {c['name']: c for c in inspector.get_columns('labour_laws')}
+    if 'embedding' not in columns or isinstance(columns['embedding']['type'], LargeBinary):
+        return 0
+    
+    dtype = Config.EMBEDDING_STORAGE_DTYPE
+    binary_type = LargeBinary().compile(dialect=db.engine.dialect)
+    logger.info(f"Migrating labour_laws.embedding from JSON text to binary {dtype}")
+    
+    db.session.execute(text(f'ALTER TABLE labour_laws ADD COLUMN embedding_bin {binary_type}'))
+    
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            'SELECT id, embedding FROM labour_laws '
+            'WHERE embedding IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': EMBEDDING_MIGRATION_CHUNK_SIZE}).fetchall()
+        
+        if not rows:
+            break
+        
+        params = []
+        for law_id, raw in rows:
+            try:
+                vector = np.asarray(json.loads(raw), dtype=dtype)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Dropping unreadable embedding for law {law_id}: {e}")
+                continue
+            params.append({'id': law_id, 'embedding': vector.tobytes(), 'dtype': dtype})
+        
+        if params:
+            db.session.execute(text(
+                'UPDATE labour_laws SET embedding_bin = :embedding, embedding_dtype = :dtype WHERE id = :id'
+            ), params)
+            converted += len(params)
+        
+        last_id = rows[-1][0]
+    
+    db.session.execute(text('ALTER TABLE labour_laws DROP COLUMN embedding'))
+    db.session.execute(text('ALTER TABLE labour_laws RENAME COLUMN embedding_bin TO embedding'))
+    db.session.commit()
+    
+    logger.info(f"Converted {converted} embeddings to binary {dtype}")
+    return converted
+
+def migrate_embeddings_to_sparse():
+    converted = 0
+    last_id = 0
+    
+    while True:
+        rows = db.session.execute(text(
+            'SELECT id, embedding, embedding_dtype FROM labour_laws '
+            'WHERE embedding IS NOT NULL AND embedding_indices IS NULL AND id > :last_id '
+            'ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': EMBEDDING_MIGRATION_CHUNK_SIZE}).fetchall()
+        
+        if not rows:
+            break
+        
+        params = []
+        for law_id, raw, dtype in rows:
+            dtype = dtype or 'float32'
+            values, indices, dim = sparse_embeddings.encode(np.frombuffer(raw, dtype=dtype), dtype)
+            params.append({'id': law_id, 'embedding': values, 'indices': indices, 'dim': dim})
+        
+        db.session.execute(text(
+            'UPDATE labour_laws SET embedding = :embedding, embedding_indices = :indices, '
+            'embedding_dim = :dim WHERE id = :id'
+        ), params)
+        db.session.commit()
+        converted += len(params)
+        last_id = rows[-1][0]
+    
+    if converted:
+        logger.info(f"Converted {converted} dense embeddings to sparse storage")
+    return converted
+
+def migrate_minhash_signatures():
+    table = LabourLaw.__table__
+    statement = update(table).where(table.c.id == bindparam('law_id')).values(
+        minhash=bindparam('signature'),
+        updated_at=table.c.updated_at
+    )
+    
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.content).where(
+                table.c.minhash.is_(None), table.c.id > last_id
+            ).order_by(table.c.id).limit(EMBEDDING_MIGRATION_CHUNK_SIZE)
+        ).fetchall()
+        
+        if not rows:
+            break
+        
+        params = []
+        for law_id, content in rows:
+            signature = minhasher.signature(content)
+            params.append({'law_id': law_id, 'signature': signature.tobytes() if signature is not None else b''})
+        
+        db.session.execute(statement, params)
+        db.session.commit()
+        converted += len(params)
+        last_id = rows[-1][0]
+    
+    if converted:
+        logger.info(f"Backfilled MinHash signatures for {converted} laws")
+    return converted
+
+def run_migrations():
+    add_missing_columns()
+    migrate_embeddings_to_binary()
+    migrate_embeddings_to_sparse()
+    migrate_minhash_signatures()
@@ -0,0 +1,72 @@
+import json
+from datetime import datetime
+from sqlalchemy import insert, update, bindparam
+from src.database.db import db
+from models import AuditLog, CrawlFrontier
+
+class UnitOfWork:
+    
+    def __init__(self, flush_size, frontier_session=None):
+        self.flush_size = max(1, flush_size)
+        self.frontier_session = frontier_session
+        self._audit_rows = []
+        self._laws = {}
+        self._completed = []
+        self._items = 0
+    
+    @property
+    def due(self):
+        return self._items >= self.flush_size
+    
+    def log(self, session_id, action, url, source, status, message, law_id=None, details=None):
+        self._audit_rows.append({
+            'crawl_session_id': session_id,
+            'action': action,
+            'law_id': law_id,
+            'url': url,
+            'source': source,
+            'status': status,
+            'message': message,
+            'details': json.dumps(details) if details else None,
+            'timestamp': datetime.utcnow()
+        })
+    
+    @property
+    def laws(self):
+        return list(self._laws.values())
+    
+    def track(self, law):
+        self._laws[law.id] = law
+    
+    def item_done(self, url=None, result=None):
+        self._items += 1
+        if self.frontier_session and url:
+            self._completed.append({'b_url': url, 'b_result': result})
+    
+    def commit(self):
+        laws = list(self._laws.values())
+        audit_rows = self._audit_rows
+        completed = self._completed
+        self._laws = {}
+        self._audit_rows = []
+        self._completed = []
+        self._items = 0
+        
+        try:
+            if audit_rows:
+                db.session.execute(insert(AuditLog), audit_rows)
+            if completed:
+                frontier = CrawlFrontier.__table__
+                db.session.execute(
+                    update(frontier).where(
+                        frontier.c.crawl_session_id == self.frontier_session,
+                        frontier.c.url == bindparam('b_url')
+                    ).values(status='done', result=bindparam('b_result')),
+                    completed
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return laws
@@ -1,17 +1,32 @@
 from datetime import datetime
 from src.database.db import db
+from src.database.unit_of_work import UnitOfWork
+from src.database.ingest_pipeline import IngestPipeline
+from src.database.law_history import law_history
 from models import LabourLaw, AuditLog, CrawlSession
 from src.embeddings.embedding_service import embedding_service
+from src.search.vector_index import vector_index
+from src.search.ann_index import ann_index
+from src.search.lsh_index import lsh_index
+from src.search.bm25_index import bm25_index
+from src.search.filters import law_metadata
+from src.search.search_service import search_service
+from src.embeddings.passage_service import passage_service
+from config.settings import Config
 from src.preprocessor.text_processor import text_processor
-from src.summarizer.groq_summarizer import groq_summarizer
+from src.summarizer.summary_queue import summary_queue
 from src.utils.logger import logger
 import uuid
 
+PREFETCH_CHUNK_SIZE = 500
+RESULT_STATS = {'error': 'errors'}
+
 class UpsertService:
     
-    def __init__(self, similarity_threshold=0.85, content_similarity_threshold=0.95):
+    def __init__(self, similarity_threshold=0.85, content_similarity_threshold=0.95, flush_size=None):
         self.similarity_threshold = similarity_threshold
         self.content_similarity_threshold = content_similarity_threshold
+        self.flush_size = flush_size or Config.UPSERT_FLUSH_SIZE
     
     def create_session(self):
         session_id = str(uuid.uuid4())[:8]
@@ -26,16 +41,32 @@ class UpsertService:
         
         return session_id
     
-    def complete_session(self, session_id, stats):
+    def session_stats(self, session_id):
+        session = CrawlSession.query.filter_by(session_id=session_id).first()
+        return {
+            'total': session.total_pages or 0,
+            'inserted': session.inserted or 0,
+            'updated': session.updated or 0,
+            'skipped': session.skipped or 0,
+            'errors': session.errors or 0
+        }
+    
+    def checkpoint_session(self, session_id, stats):
         session = CrawlSession.query.filter_by(session_id=session_id).first()
         if session:
-            session.status = 'completed'
-            session.completed_at = datetime.utcnow()
+            session.heartbeat_at = datetime.utcnow()
             session.total_pages = stats.get('total', 0)
             session.inserted = stats.get('inserted', 0)
             session.updated = stats.get('updated', 0)
             session.skipped = stats.get('skipped', 0)
             session.errors = stats.get('errors', 0)
+        return session
+    
+    def complete_session(self, session_id, stats):
+        session = self.checkpoint_session(session_id, stats)
+        if session:
+            session.status = 'completed'
+            session.completed_at = datetime.utcnow()
             db.session.commit()
     
     def log_action(self, session_id, action, url, source, status, message, law_id=None, details=None):
@@ -53,171 +84,332 @@ class UpsertService:
         db.session.add(log)
         db.session.commit()
     
-    def find_similar_law(self, embedding):
-        existing_laws = LabourLaw.query.all()
+    def find_duplicate_law(self, processed):
+        exact = db.session.query(LabourLaw.id).filter_by(
+            content_hash=processed['content_hash']
+        ).first()
+        
+        if exact:
+            return exact.id, 'Exact duplicate of an existing law (same content hash)'
+        
+        matches = lsh_index.query(
+            processed.get('minhash'),
+            threshold=Config.MINHASH_DUPLICATE_THRESHOLD,
+            limit=1
+        )
+        
+        if matches:
+            law_id, jaccard = matches[0]
+            return law_id, f'Near-duplicate of an existing law (estimated Jaccard: {jaccard:.2f})'
         
-        if not existing_laws:
+        return None, None
+    
+    def find_similar_law(self, embedding, embedding_version):
+        candidates = ann_index.search(
+            embedding,
+            version=embedding_version,
+            limit=Config.ANN_SHORTLIST_SIZE,
+            min_score=self.similarity_threshold
+        )
+        
+        if not candidates:
             return None, 0.0
         
+        shortlist = LabourLaw.query.filter(
+            LabourLaw.id.in_([law_id for law_id, _ in candidates]),
+            LabourLaw.embedding_version == embedding_version
+        ).all()
+        
         best_match = None
         best_similarity = 0.0
         
-        for law in existing_laws:
-            law_embedding = law.get_embedding()
-            if law_embedding:
-                similarity = embedding_service.calculate_similarity(embedding, law_embedding)
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match = law
+        for law in shortlist:
+            similarity = embedding_service.calculate_similarity(embedding, law.get_embedding())
+            if similarity > best_similarity:
+                best_similarity = similarity
+                best_match = law
         
         if best_similarity >= self.similarity_threshold:
             return best_match, best_similarity
         
         return None, best_similarity
     
-    def process_item(self, item, session_id):
-        url = item.get('url', '')
-        source = item.get('source', 'Unknown')
+    def prefetch_existing(self, urls):
+        urls = list({url for url in urls if url})
+        existing = dict.fromkeys(urls)
         
-        try:
-            processed = text_processor.process(
-                item.get('html', item.get('content', '')),
-                url
+        for start in range(0, len(urls), PREFETCH_CHUNK_SIZE):
+            rows = db.session.query(LabourLaw.url, LabourLaw.id, LabourLaw.content_hash).filter(
+                LabourLaw.url.in_(urls[start:start + PREFETCH_CHUNK_SIZE])
             )
-            
-            content = processed['content']
-            if not content or len(content) < 100:
-                self.log_action(
-                    session_id, 'SKIP', url, source, 'skipped',
-                    'Content too short or empty'
-                )
-                return 'skipped'
-            
-            embedding = embedding_service.generate_embedding(content)
-            if not embedding:
-                self.log_action(
-                    session_id, 'ERROR', url, source, 'error',
-                    'Failed to generate embedding'
-                )
-                return 'error'
-            
+            for url, law_id, content_hash in rows:
+                existing[url] = (law_id, content_hash)
+        
+        return existing
+    
+    def lookup_existing(self, url, known_urls):
+        if url and url not in known_urls:
+            known_urls.update(self.prefetch_existing([url]))
+        return known_urls.get(url)
+    
+    def _remember(self, known_urls, law):
+        if known_urls is not None:
+            known_urls[law.url] = (law.id, law.content_hash)
+    
+    def _log(self, uow, *args, **kwargs):
+        if uow is None:
+            self.log_action(*args, **kwargs)
+        else:
+            uow.log(*args, **kwargs)
+    
+    def _save(self, uow, law):
+        db.session.flush()
+        summary_queue.enqueue(law)
+        if uow is None:
+            db.session.commit()
+    
+    def _index_passages(self, uow, law):
+        if uow is None:
+            passage_service.index_laws([law])
+            search_service.invalidate()
+        else:
+            uow.track(law)
+    
+    def _index_law(self, uow, law, embedding, embedding_version, minhash, known_urls):
+        vector_index.upsert(law.id, embedding, law_metadata(law), embedding_version)
+        lsh_index.add(law.id, minhash)
+        bm25_index.add(law.id, law.title, law.content, law_metadata(law))
+        self._index_passages(uow, law)
+        self._remember(known_urls, law)
+    
+    def _commit_unit(self, uow):
+        written = None
+        try:
+            # Passages are written in the same transaction as their laws: a law committed
+            # without passages would be invisible to semantic search.
+            if uow.laws:
+                written = passage_service.write_laws(uow.laws)
+            uow.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to commit batch writes, rebuilding in-memory indexes: {e}")
+            vector_index.build()
+            lsh_index.build()
+            bm25_index.build()
+            raise
+        
+        if written:
+            passage_service.publish(written)
+            search_service.invalidate()
+    
+    def plan_item(self, url, processed, known_urls=None, embedded=None):
+        content = processed['content']
+        if not content or len(content) < 100:
+            return 'skip', None, 'Content too short or empty', embedded
+        
+        if known_urls is None:
             existing_by_url = LabourLaw.query.filter_by(url=url).first()
+        else:
+            known = known_urls.get(url)
+            existing_by_url = db.session.get(LabourLaw, known[0]) if known else None
+        
+        if existing_by_url and existing_by_url.content_hash == processed['content_hash']:
+            return 'skip', existing_by_url.id, 'Content unchanged (same hash)', embedded
+        
+        if not existing_by_url:
+            duplicate_id, reason = self.find_duplicate_law(processed)
+            if duplicate_id:
+                return 'skip', duplicate_id, reason, embedded
+        
+        embedding, embedding_version = embedded or embedding_service.embed(content)
+        if embedding is None:
+            return 'error', None, 'Failed to generate embedding', None
+        embedded = (embedding, embedding_version)
+        
+        if existing_by_url:
+            return 'update', existing_by_url, None, embedded
+        
+        similar_law, similarity = self.find_similar_law(embedding, embedding_version)
+        
+        if similar_law:
+            if similar_law.content_hash == processed['content_hash']:
+                return 'skip', similar_law.id, f'Semantically similar law exists (similarity: {similarity:.2f})', embedded
+            return 'update_similar', similar_law, similarity, embedded
+        
+        return 'insert', None, None, embedded
+    
+    def log_plan(self, uow, session_id, url, source, plan):
+        action, target, message, _ = plan
+        
+        if action == 'skip':
+            self._log(uow, session_id, 'SKIP', url, source, 'skipped', message, law_id=target)
+            return 'skipped'
+        
+        self._log(uow, session_id, 'ERROR', url, source, 'error', message)
+        return 'error'
+    
+    def _apply(self, uow, session_id, url, source, processed, plan, known_urls, saved):
+        action, target, similarity, (embedding, embedding_version) = plan
+        content = processed['content']
+        
+        if action == 'update':
+            existing_by_url = target
+            previous = law_history.capture(existing_by_url)
+            existing_by_url.content = content
+            existing_by_url.title = processed['title'] or existing_by_url.title
+            existing_by_url.category = processed['category']
+            existing_by_url.language = processed['language']
+            existing_by_url.publication_date = processed['publication_date'] or existing_by_url.publication_date
+            existing_by_url.content_hash = processed['content_hash']
+            existing_by_url.set_embedding(embedding, embedding_version)
+            existing_by_url.set_minhash(processed['minhash'])
+            existing_by_url.version += 1
+            existing_by_url.updated_at = datetime.utcnow()
+            law_history.record(existing_by_url, previous)
             
-            if existing_by_url:
-                if existing_by_url.content_hash == processed['content_hash']:
-                    self.log_action(
-                        session_id, 'SKIP', url, source, 'skipped',
-                        'Content unchanged (same hash)',
-                        law_id=existing_by_url.id
-                    )
-                    return 'skipped'
-                
-                summary = groq_summarizer.summarize(content, processed['title'])
-                
-                existing_by_url.content = content
-                existing_by_url.summary = summary
-                existing_by_url.title = processed['title'] or existing_by_url.title
-                existing_by_url.category = processed['category']
-                existing_by_url.language = processed['language']
-                existing_by_url.content_hash = processed['content_hash']
-                existing_by_url.set_embedding(embedding)
-                existing_by_url.version += 1
-                existing_by_url.updated_at = datetime.utcnow()
-                
-                db.session.commit()
-                
-                self.log_action(
-                    session_id, 'UPDATE', url, source, 'success',
-                    f'Updated existing law (version {existing_by_url.version})',
-                    law_id=existing_by_url.id
-                )
-                return 'updated'
-            
-            similar_law, similarity = self.find_similar_law(embedding)
+            self._save(uow, existing_by_url)
+            saved.append((existing_by_url, embedding, embedding_version, processed['minhash']))
             
-            if similar_law:
-                if similar_law.content_hash == processed['content_hash']:
-                    self.log_action(
-                        session_id, 'SKIP', url, source, 'skipped',
-                        f'Semantically similar law exists (similarity: {similarity:.2f})',
-                        law_id=similar_law.id
-                    )
-                    return 'skipped'
-                
-                summary = groq_summarizer.summarize(content, processed['title'])
-                
-                similar_law.content = content
-                similar_law.summary = summary
-                similar_law.title = processed['title'] or similar_law.title
-                similar_law.url = url
-                similar_law.category = processed['category']
-                similar_law.language = processed['language']
-                similar_law.content_hash = processed['content_hash']
-                similar_law.set_embedding(embedding)
-                similar_law.version += 1
-                similar_law.updated_at = datetime.utcnow()
-                
-                db.session.commit()
-                
-                self.log_action(
-                    session_id, 'UPDATE', url, source, 'success',
-                    f'Updated similar law (similarity: {similarity:.2f}, version {similar_law.version})',
-                    law_id=similar_law.id
-                )
-                return 'updated'
+            self._log(
+                uow, session_id, 'UPDATE', url, source, 'success',
+                f'Updated existing law (version {existing_by_url.version})',
+                law_id=existing_by_url.id
+            )
+            return 'updated'
+        
+        if action == 'update_similar':
+            similar_law = target
+            previous = law_history.capture(similar_law)
+            similar_law.content = content
+            similar_law.title = processed['title'] or similar_law.title
+            if known_urls is not None:
+                known_urls.pop(similar_law.url, None)
+            similar_law.url = url
+            similar_law.category = processed['category']
+            similar_law.language = processed['language']
+            similar_law.publication_date = processed['publication_date'] or similar_law.publication_date
+            similar_law.content_hash = processed['content_hash']
+            similar_law.set_embedding(embedding, embedding_version)
+            similar_law.set_minhash(processed['minhash'])
+            similar_law.version += 1
+            similar_law.updated_at = datetime.utcnow()
+            law_history.record(similar_law, previous)
             
-            summary = groq_summarizer.summarize(content, processed['title'])
+            self._save(uow, similar_law)
+            saved.append((similar_law, embedding, embedding_version, processed['minhash']))
             
-            new_law = LabourLaw(
-                title=processed['title'] or 'Untitled Law',
-                content=content,
-                summary=summary,
-                url=url,
-                source=source,
-                category=processed['category'],
-                language=processed['language'],
-                content_hash=processed['content_hash']
+            self._log(
+                uow, session_id, 'UPDATE', url, source, 'success',
+                f'Updated similar law (similarity: {similarity:.2f}, version {similar_law.version})',
+                law_id=similar_law.id
             )
-            new_law.set_embedding(embedding)
+            return 'updated'
+        
+        new_law = LabourLaw(
+            title=processed['title'] or 'Untitled Law',
+            content=content,
+            url=url,
+            source=source,
+            category=processed['category'],
+            language=processed['language'],
+            publication_date=processed['publication_date'],
+            content_hash=processed['content_hash']
+        )
+        new_law.set_embedding(embedding, embedding_version)
+        new_law.set_minhash(processed['minhash'])
+        
+        db.session.add(new_law)
+        self._save(uow, new_law)
+        saved.append((new_law, embedding, embedding_version, processed['minhash']))
+        
+        self._log(
+            uow, session_id, 'INSERT', url, source, 'success',
+            'Inserted new law',
+            law_id=new_law.id
+        )
+        return 'inserted'
+    
+    def process_item(self, item, session_id, fingerprint=None, known_urls=None, uow=None, prepared=None):
+        url = item.get('url', '')
+        source = item.get('source', 'Unknown')
+        savepoint = db.session.begin_nested() if uow else None
+        # The in-memory indexes only learn about a law once its savepoint has committed;
+        # a rolled back item must not leave an id behind for find_duplicate_law to match.
+        saved = []
+        
+        try:
+            if prepared is None:
+                cleaned_text, content_hash = fingerprint or (None, None)
+                processed = text_processor.process(
+                    item.get('html', item.get('content', '')),
+                    url,
+                    cleaned_text=cleaned_text,
+                    content_hash=content_hash
+                )
+                embedded = None
+            else:
+                processed, embedded = prepared
             
-            db.session.add(new_law)
-            db.session.commit()
+            plan = self.plan_item(url, processed, known_urls, embedded)
+            if plan[0] in ('skip', 'error'):
+                return self.log_plan(uow, session_id, url, source, plan)
             
-            self.log_action(
-                session_id, 'INSERT', url, source, 'success',
-                'Inserted new law',
-                law_id=new_law.id
-            )
-            return 'inserted'
+            return self._apply(uow, session_id, url, source, processed, plan, known_urls, saved)
                 
         except Exception as e:
+            if savepoint is not None:
+                savepoint.rollback()
+            saved.clear()
             logger.error(f"Error processing item {url}: {e}")
-            self.log_action(
-                session_id, 'ERROR', url, source, 'error',
+            self._log(
+                uow, session_id, 'ERROR', url, source, 'error',
                 str(e)
             )
             return 'error'
+        finally:
+            if savepoint is not None and savepoint.is_active:
+                savepoint.commit()
+            for law, embedding, embedding_version, minhash in saved:
+                self._index_law(uow, law, embedding, embedding_version, minhash, known_urls)
     
-    def process_batch(self, items):
-        session_id = self.create_session()
+    def process_batch(self, items, session_id=None, known_urls=None):
+        frontier_session = session_id
+        if session_id is None:
+            session_id = self.create_session()
         
-        stats = {
-            'total': len(items),
-            'inserted': 0,
-            'updated': 0,
-            'skipped': 0,
-            'errors': 0
-        }
+        stats = self.session_stats(session_id)
         
         logger.info(f"Starting batch processing with session {session_id}")
         
-        for i, item in enumerate(items):
-            logger.info(f"Processing item {i+1}/{len(items)}: {item.get('url', 'unknown')}")
-            
-            result = self.process_item(item, session_id)
-            stats[result] = stats.get(result, 0) + 1
+        uow = UnitOfWork(self.flush_size, frontier_session)
+        if known_urls is None:
+            known_urls = {}
+            if isinstance(items, (list, tuple)):
+                known_urls = self.prefetch_existing(item.get('url') for item in items)
         
+        results = IngestPipeline(self).run(items, session_id, known_urls, uow)
+        try:
+            for item, result in results:
+                stats['total'] += 1
+                stats[RESULT_STATS.get(result, result)] += 1
+                
+                uow.item_done(item.get('url'), result)
+                if uow.due:
+                    self.checkpoint_session(session_id, stats)
+                    self._commit_unit(uow)
+        finally:
+            results.close()
+        
+        self.checkpoint_session(session_id, stats)
+        self._commit_unit(uow)
         self.complete_session(session_id, stats)
+        ann_index.save()
+        bm25_index.save()
+        
+        if embedding_service.needs_fit and LabourLaw.query.count():
+            from src.embeddings.model_refit import refit_embedding_model
+            logger.info("No fitted embedding model yet; fitting initial model on stored corpus")
+            refit_embedding_model()
         
         logger.info(f"Batch processing completed: {stats}")
         
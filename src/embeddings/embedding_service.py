@@ -1,108 +1,227 @@
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import hashlib
+from scipy import sparse
+from datetime import datetime
 import os
+import pickle
+import threading
+from config.settings import Config
+from src.embeddings import sparse as sparse_embeddings
+from src.embeddings.hashing_embedder import hashing_embedder
 from src.utils.logger import logger
 
+HASH_EMBEDDING_VERSION = hashing_embedder.version
+
 class EmbeddingService:
     _instance = None
-    _vectorizer = None
-    _corpus_vectors = None
-    _corpus_texts = []
+    _model = None
+    _model_mtime = None
+    _staged_model = None
+    _lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        if EmbeddingService._vectorizer is None:
-            self._initialize_vectorizer()
+    def __init__(self, model_dir=None, backend=None):
+        self.model_dir = model_dir or Config.EMBEDDING_MODEL_DIR
+        self.backend = backend or Config.EMBEDDING_BACKEND
+        if self.backend == 'tfidf' and EmbeddingService._model is None:
+            self.load_model()
+    
+    @property
+    def _current_pointer(self):
+        return os.path.join(self.model_dir, 'CURRENT')
+    
+    def _model_path(self, version):
+        return os.path.join(self.model_dir, f'{version}.pkl')
+    
+    def _new_vectorizer(self):
+        return TfidfVectorizer(
+            max_features=Config.EMBEDDING_MAX_FEATURES,
+            stop_words='english',
+            ngram_range=Config.EMBEDDING_NGRAM_RANGE,
+            min_df=1,
+            max_df=0.95
+        )
     
-    def _initialize_vectorizer(self):
+    def _truncate(self, text):
+        return text[:Config.EMBEDDING_MAX_CHARS] if len(text) > Config.EMBEDDING_MAX_CHARS else text
+    
+    def load_model(self, version=None):
         try:
-            logger.info("Initializing TF-IDF vectorizer for embeddings")
-            EmbeddingService._vectorizer = TfidfVectorizer(
-                max_features=5000,
-                stop_words='english',
-                ngram_range=(1, 2),
-                min_df=1,
-                max_df=0.95
-            )
-            logger.info("TF-IDF vectorizer initialized successfully")
+            if version is None:
+                if not os.path.exists(self._current_pointer):
+                    logger.info("No fitted TF-IDF model found; using hash embeddings until a model is fitted")
+                    return None
+                with open(self._current_pointer) as f:
+                    version = f.read().strip()
+                EmbeddingService._model_mtime = os.path.getmtime(self._current_pointer)
+            
+            with open(self._model_path(version), 'rb') as f:
+                vectorizer = pickle.load(f)
+            
+            EmbeddingService._model = (version, vectorizer)
+            logger.info(f"Loaded TF-IDF embedding model {version}")
+            return version
         except Exception as e:
-            logger.error(f"Failed to initialize vectorizer: {e}")
-            raise
+            logger.error(f"Failed to load embedding model: {e}")
+            return None
     
-    def generate_embedding(self, text):
-        if not text:
+    def _get_model(self):
+        if self.backend != 'tfidf':
             return None
         
         try:
-            text = text[:10000] if len(text) > 10000 else text
-            
-            if not EmbeddingService._corpus_texts:
-                EmbeddingService._corpus_texts = [text]
-                EmbeddingService._vectorizer.fit([text])
-                embedding = EmbeddingService._vectorizer.transform([text]).toarray()[0]
-            else:
-                temp_texts = EmbeddingService._corpus_texts + [text]
-                EmbeddingService._vectorizer.fit(temp_texts)
-                embedding = EmbeddingService._vectorizer.transform([text]).toarray()[0]
-            
-            return embedding.tolist()
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return self._generate_hash_embedding(text)
+            mtime = os.path.getmtime(self._current_pointer)
+        except OSError:
+            mtime = None
+        
+        if mtime is not None and mtime != EmbeddingService._model_mtime:
+            with EmbeddingService._lock:
+                if mtime != EmbeddingService._model_mtime:
+                    self.load_model()
+        
+        return EmbeddingService._model
+    
+    @property
+    def model_version(self):
+        model = self._get_model()
+        return model[0] if model else None
+    
+    @property
+    def active_version(self):
+        return self.model_version or HASH_EMBEDDING_VERSION
+    
+    @property
+    def fittable(self):
+        return self.backend == 'tfidf'
+    
+    @property
+    def needs_fit(self):
+        return self.fittable and self.model_version is None
+    
+    def _load_vectorizer(self, version):
+        model = self._get_model()
+        if model and model[0] == version:
+            return model[1]
+        
+        staged = EmbeddingService._staged_model
+        if staged and staged[0] == version:
+            return staged[1]
+        
+        with open(self._model_path(version), 'rb') as f:
+            vectorizer = pickle.load(f)
+        EmbeddingService._staged_model = (version, vectorizer)
+        return vectorizer
+    
+    def activate(self, version):
+        vectorizer = self._load_vectorizer(version)
+        
+        tmp_pointer = self._current_pointer + '.tmp'
+        with open(tmp_pointer, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, self._current_pointer)
+        
+        with EmbeddingService._lock:
+            EmbeddingService._model = (version, vectorizer)
+            EmbeddingService._model_mtime = os.path.getmtime(self._current_pointer)
+        
+        logger.info(f"Activated TF-IDF embedding model {version}")
+    
+    def fit_model(self, texts, activate=True):
+        counter = {'documents': 0}
+        
+        def documents():
+            for t in texts:
+                if t:
+                    counter['documents'] += 1
+                    yield self._truncate(t)
+        
+        vectorizer = self._new_vectorizer()
+        try:
+            vectorizer.fit(documents())
+        except ValueError as e:
+            logger.warning(f"Could not fit the embedding model: {e}")
+            return None
+        
+        if not counter['documents']:
+            logger.warning("No texts available to fit the embedding model")
+            return None
+        
+        version = f"tfidf-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+        
+        os.makedirs(self.model_dir, exist_ok=True)
+        with open(self._model_path(version), 'wb') as f:
+            pickle.dump(vectorizer, f)
+        EmbeddingService._staged_model = (version, vectorizer)
+        
+        logger.info(f"Fitted TF-IDF embedding model {version} on {counter['documents']} documents "
+                    f"({len(vectorizer.vocabulary_)} features)")
+        
+        if activate:
+            self.activate(version)
+        return version
     
-    def _generate_hash_embedding(self, text):
+    def generate_embedding(self, text):
+        return self.embed(text)[0]
+    
+    def embed(self, text):
+        if not text:
+            return None, None
+        
+        model = self._get_model()
+        if model is None:
+            return hashing_embedder.embed(text), HASH_EMBEDDING_VERSION
+        
+        version, vectorizer = model
         try:
-            words = text.lower().split()
-            embedding = [0.0] * 256
-            
-            for i, word in enumerate(words[:500]):
-                hash_val = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
-                idx = hash_val % 256
-                embedding[idx] += 1.0 / (i + 1)
-            
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = [x / norm for x in embedding]
-            
-            return embedding
+            embedding = vectorizer.transform([self._truncate(text)])
+            return sparse_embeddings.to_csr(embedding), version
         except Exception as e:
-            logger.error(f"Error generating hash embedding: {e}")
-            return None
+            logger.error(f"Error generating embedding: {e}")
+            return None, None
     
     def generate_embeddings_batch(self, texts):
+        return self.embed_batch(texts)[0]
+    
+    def embed_batch(self, texts, version=None):
         if not texts:
-            return []
+            return None, None
+        
+        if version is None:
+            model = self._get_model()
+            version = model[0] if model else HASH_EMBEDDING_VERSION
+        
+        if version == HASH_EMBEDDING_VERSION:
+            return hashing_embedder.embed_batch(texts), HASH_EMBEDDING_VERSION
         
         try:
-            truncated_texts = [t[:10000] if len(t) > 10000 else t for t in texts]
+            vectorizer = self._load_vectorizer(version)
+            truncated_texts = [self._truncate(t or '') for t in texts]
+            embeddings = vectorizer.transform(truncated_texts)
             
-            EmbeddingService._vectorizer.fit(truncated_texts)
-            embeddings = EmbeddingService._vectorizer.transform(truncated_texts).toarray()
-            
-            return [emb.tolist() for emb in embeddings]
+            return sparse_embeddings.to_csr(embeddings), version
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
-            return [self._generate_hash_embedding(t) for t in texts]
+            return None, None
     
     def calculate_similarity(self, embedding1, embedding2):
         if embedding1 is None or embedding2 is None:
             return 0.0
         
         try:
-            vec1 = np.array(embedding1).reshape(1, -1)
-            vec2 = np.array(embedding2).reshape(1, -1)
+            vec1 = sparse_embeddings.to_csr(embedding1)
+            vec2 = sparse_embeddings.to_csr(embedding2)
             
-            min_len = min(vec1.shape[1], vec2.shape[1])
-            vec1 = vec1[:, :min_len]
-            vec2 = vec2[:, :min_len]
+            if vec1.shape[1] != vec2.shape[1]:
+                logger.debug(f"Embedding dimensions differ ({vec1.shape[1]} vs {vec2.shape[1]}); "
+                             f"vectors come from different models")
+                return 0.0
             
-            if np.all(vec1 == 0) or np.all(vec2 == 0):
+            if vec1.nnz == 0 or vec2.nnz == 0:
                 return 0.0
             
             similarity = cosine_similarity(vec1, vec2)[0][0]
@@ -114,8 +233,8 @@ class EmbeddingService:
     
     def _jaccard_similarity(self, embedding1, embedding2):
         try:
-            set1 = set(i for i, v in enumerate(embedding1) if v > 0)
-            set2 = set(i for i, v in enumerate(embedding2) if v > 0)
+            set1 = set(sparse_embeddings.to_csr(embedding1).indices.tolist())
+            set2 = set(sparse_embeddings.to_csr(embedding2).indices.tolist())
             
             if not set1 or not set2:
                 return 0.0
@@ -129,17 +248,22 @@ class EmbeddingService:
             return 0.0
     
     def find_most_similar(self, query_embedding, embeddings_list, threshold=0.85):
-        if not query_embedding or not embeddings_list:
+        if query_embedding is None or not embeddings_list:
+            return None, 0.0
+        
+        query = sparse_embeddings.to_csr(query_embedding)
+        rows = [sparse_embeddings.to_csr(e) for e in embeddings_list]
+        candidates = [idx for idx, row in enumerate(rows) if row is not None and row.shape[1] == query.shape[1]]
+        
+        if not candidates:
             return None, 0.0
         
-        best_match_idx = None
-        best_similarity = 0.0
+        matrix = sparse.vstack([rows[idx] for idx in candidates], format='csr')
+        similarities = cosine_similarity(matrix, query).ravel()
         
-        for idx, embedding in enumerate(embeddings_list):
-            similarity = self.calculate_similarity(query_embedding, embedding)
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match_idx = idx
+        best = int(np.argmax(similarities))
+        best_match_idx = candidates[best]
+        best_similarity = float(similarities[best])
         
         if best_similarity >= threshold:
             return best_match_idx, best_similarity
@@ -0,0 +1,93 @@
+import re
+import zlib
+import numpy as np
+from scipy import sparse
+from config.settings import Config
+from src.embeddings import sparse as sparse_embeddings
+
+NGRAM_MULTIPLIER = np.uint64(0x01000193)
+MASK_32 = np.uint64(0xFFFFFFFF)
+
+class HashingEmbedder:
+    
+    TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+    
+    def __init__(self, dim=None, ngram_range=None):
+        self.dim = dim or Config.HASHING_EMBEDDING_DIM
+        self.ngram_range = ngram_range or Config.EMBEDDING_NGRAM_RANGE
+        self._mask = np.uint32(self.dim - 1) if self.dim & (self.dim - 1) == 0 else None
+    
+    @property
+    def version(self):
+        low, high = self.ngram_range
+        return f'hashing-{self.dim}-{low}{high}'
+    
+    def _token_hashes(self, text):
+        tokens = self.TOKEN_PATTERN.findall((text or '').lower())
+        if not tokens:
+            return np.empty(0, dtype=np.uint32)
+        
+        vocabulary = {token: i for i, token in enumerate(dict.fromkeys(tokens))}
+        ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        hashes = np.fromiter(
+            map(zlib.crc32, map(str.encode, vocabulary)),
+            dtype=np.uint32,
+            count=len(vocabulary)
+        )
+        return hashes[ids]
+    
+    def _feature_hashes(self, token_hashes):
+        low, high = self.ngram_range
+        features = []
+        
+        for n in range(low, high + 1):
+            if token_hashes.shape[0] < n:
+                break
+            combined = token_hashes[:token_hashes.shape[0] - n + 1].astype(np.uint64)
+            for offset in range(1, n):
+                combined = (combined * NGRAM_MULTIPLIER + token_hashes[offset:offset + combined.shape[0]]) & MASK_32
+            if n > 1:
+                combined = self._mix(combined)
+            features.append(combined.astype(np.uint32))
+        
+        return np.concatenate(features) if features else np.empty(0, dtype=np.uint32)
+    
+    @staticmethod
+    def _mix(hashes):
+        hashes = hashes ^ (hashes >> np.uint64(16))
+        hashes = (hashes * np.uint64(0x85EBCA6B)) & MASK_32
+        hashes = hashes ^ (hashes >> np.uint64(13))
+        hashes = (hashes * np.uint64(0xC2B2AE35)) & MASK_32
+        return hashes ^ (hashes >> np.uint64(16))
+    
+    def embed_batch(self, texts):
+        rows, cols, values = [], [], []
+        
+        for row, text in enumerate(texts):
+            features = self._feature_hashes(self._token_hashes(text))
+            if features.shape[0] == 0:
+                continue
+            
+            hashes, counts = np.unique(features, return_counts=True)
+            weights = 1.0 + np.log(counts.astype(np.float32))
+            signs = np.where(hashes & np.uint32(0x80000000), -1.0, 1.0).astype(np.float32)
+            
+            rows.append(np.full(hashes.shape[0], row, dtype=np.int32))
+            cols.append(hashes & self._mask if self._mask is not None else hashes % np.uint32(self.dim))
+            values.append(signs * weights)
+        
+        if not rows:
+            return sparse.csr_matrix((len(texts), self.dim), dtype=np.float32)
+        
+        matrix = sparse.csr_matrix(
+            (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols).astype(np.int32))),
+            shape=(len(texts), self.dim)
+        )
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        return sparse_embeddings.normalize_rows(matrix)
+    
+    def embed(self, text):
+        return self.embed_batch([text])
+
+hashing_embedder = HashingEmbedder()
@@ -0,0 +1,229 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from src.database.db import db
+from models import LabourLaw, LawPassage, EmbeddingJob
+from src.embeddings import sparse as sparse_embeddings
+from src.embeddings.embedding_service import embedding_service
+from src.embeddings.passage_service import passage_service
+from src.preprocessor.chunker import passage_chunker
+from src.search.passage_index import passage_index
+from src.search.vector_index import vector_index
+from src.utils.logger import logger
+
+REEMBED_CHUNK_SIZE = 200
+JOB_STALE_SECONDS = 300
+
+_job_lock = threading.Lock()
+
+def _iter_passages(chunk_size=REEMBED_CHUNK_SIZE):
+    query = db.session.query(LabourLaw.content).order_by(LabourLaw.id)
+    for (content,) in query.yield_per(chunk_size):
+        for start, end in passage_chunker.spans(content):
+            yield content[start:end]
+
+def _stage_chunk(laws, version):
+    embeddings, _ = embedding_service.embed_batch([law.content for law in laws], version)
+    if embeddings is None:
+        raise RuntimeError(f"Failed to embed laws {laws[0].id}-{laws[-1].id} with {version}")
+    
+    params = []
+    for row, law in enumerate(laws):
+        values, indices, dim = sparse_embeddings.encode(embeddings[row], law.embedding_dtype or 'float32')
+        params.append({
+            'id': law.id,
+            'embedding': values,
+            'indices': indices,
+            'dim': dim,
+            'dtype': law.embedding_dtype or 'float32',
+            'version': version
+        })
+    
+    db.session.execute(text(
+        'UPDATE labour_laws SET staged_embedding = :embedding, staged_embedding_indices = :indices, '
+        'staged_embedding_dim = :dim, staged_embedding_dtype = :dtype, staged_embedding_version = :version '
+        'WHERE id = :id'
+    ), params)
+    
+    passage_service.stage_laws(laws, version)
+
+def _heartbeat(job):
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+def _stage_all(job, chunk_size):
+    while True:
+        laws = LabourLaw.query.filter(
+            LabourLaw.id > job.last_law_id
+        ).order_by(LabourLaw.id).limit(chunk_size).all()
+        
+        if not laws:
+            break
+        
+        _stage_chunk(laws, job.target_version)
+        job.last_law_id = laws[-1].id
+        job.processed += len(laws)
+        job.total = max(job.total, job.processed)
+        _heartbeat(job)
+        
+        logger.info(f"Embedding job {job.job_id}: staged {job.processed}/{job.total} laws "
+                    f"with {job.target_version}")
+
+def _stage_changed(job, chunk_size):
+    last_id = 0
+    while True:
+        laws = LabourLaw.query.filter(
+            LabourLaw.id > last_id,
+            db.or_(
+                LabourLaw.staged_embedding_version.is_(None),
+                LabourLaw.staged_embedding_version != job.target_version
+            )
+        ).order_by(LabourLaw.id).limit(chunk_size).all()
+        
+        if not laws:
+            break
+        
+        _stage_chunk(laws, job.target_version)
+        last_id = laws[-1].id
+        _heartbeat(job)
+        logger.info(f"Embedding job {job.job_id}: re-staged {len(laws)} laws changed during the job")
+
+def _reembed_stragglers(version, chunk_size):
+    while True:
+        laws = LabourLaw.query.filter(
+            db.or_(LabourLaw.embedding_version.is_(None), LabourLaw.embedding_version != version)
+        ).order_by(LabourLaw.id).limit(chunk_size).all()
+        
+        if not laws:
+            break
+        
+        embeddings, embedding_version = embedding_service.embed_batch([law.content for law in laws], version)
+        if embeddings is None:
+            raise RuntimeError(f"Failed to re-embed laws {laws[0].id}-{laws[-1].id} with {version}")
+        for row, law in enumerate(laws):
+            law.set_embedding(embeddings[row], embedding_version)
+        db.session.commit()
+        passage_service.index_laws(laws)
+
+def _switch_over(job, chunk_size):
+    version = job.target_version
+    
+    # updated_at moves with the vectors so that other processes' vector indexes pick the
+    # switch up on their next sync.
+    db.session.execute(text(
+        'UPDATE labour_laws SET embedding = staged_embedding, embedding_indices = staged_embedding_indices, '
+        'embedding_dim = staged_embedding_dim, embedding_dtype = staged_embedding_dtype, '
+        'embedding_version = staged_embedding_version, updated_at = :now '
+        'WHERE staged_embedding_version = :version'
+    ), {'version': version, 'now': datetime.utcnow()})
+    db.session.execute(text(
+        'UPDATE labour_laws SET staged_embedding = NULL, staged_embedding_indices = NULL, '
+        'staged_embedding_dim = NULL, staged_embedding_dtype = NULL, staged_embedding_version = NULL '
+        'WHERE staged_embedding_version IS NOT NULL'
+    ))
+    db.session.commit()
+    
+    embedding_service.activate(version)
+    
+    LawPassage.query.filter(LawPassage.embedding_version != version).delete(synchronize_session=False)
+    db.session.commit()
+    
+    _reembed_stragglers(version, chunk_size)
+    
+    vector_index.build(version)
+    passage_index.build(version)
+
+def _refresh_stateless(job, chunk_size):
+    version = embedding_service.active_version
+    job.target_version = version
+    job.status = 'running'
+    _heartbeat(job)
+    
+    _reembed_stragglers(version, chunk_size)
+    passage_service.backfill(chunk_size)
+    vector_index.build(version)
+    passage_index.build(version)
+    
+    job.processed = job.total
+    job.status = 'completed'
+    job.completed_at = datetime.utcnow()
+    db.session.commit()
+    
+    logger.info(f"Embedding job {job.job_id} completed: {version} needs no fitting, "
+                f"re-embedded laws stored with other versions")
+    return version
+
+def create_reembed_job():
+    job = EmbeddingJob(
+        job_id=str(uuid.uuid4())[:8],
+        status='pending',
+        total=LabourLaw.query.count()
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def find_resumable_job(job_id=None):
+    query = EmbeddingJob.query.filter(EmbeddingJob.status.in_(['pending', 'fitting', 'running', 'failed']))
+    if job_id:
+        query = query.filter_by(job_id=job_id)
+    job = query.order_by(EmbeddingJob.started_at.desc()).first()
+    
+    if job and job.status in ('fitting', 'running') and job.heartbeat_at and \
+            datetime.utcnow() - job.heartbeat_at < timedelta(seconds=JOB_STALE_SECONDS):
+        logger.warning(f"Embedding job {job.job_id} is still running (last heartbeat {job.heartbeat_at})")
+        return None
+    
+    return job
+
+def run_reembed_job(job, chunk_size=REEMBED_CHUNK_SIZE):
+    if not _job_lock.acquire(blocking=False):
+        logger.warning("Another embedding job is already running in this process")
+        return None
+    
+    try:
+        if not embedding_service.fittable:
+            return _refresh_stateless(job, chunk_size)
+        
+        if not job.target_version:
+            job.status = 'fitting'
+            _heartbeat(job)
+            
+            version = embedding_service.fit_model(_iter_passages(), activate=False)
+            if not version:
+                job.status = 'failed'
+                job.error = 'No laws available to fit the embedding model'
+                db.session.commit()
+                return None
+            job.target_version = version
+        
+        job.status = 'running'
+        job.error = None
+        _heartbeat(job)
+        logger.info(f"Embedding job {job.job_id}: re-embedding laws after id {job.last_law_id} "
+                    f"with {job.target_version}")
+        
+        _stage_all(job, chunk_size)
+        _stage_changed(job, chunk_size)
+        _switch_over(job, chunk_size)
+        
+        job.status = 'completed'
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        
+        logger.info(f"Embedding job {job.job_id} completed: {job.processed} laws switched to {job.target_version}")
+        return job.target_version
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Embedding job {job.job_id} failed: {e}")
+        job.status = 'failed'
+        job.error = str(e)
+        db.session.commit()
+        return None
+    finally:
+        _job_lock.release()
+
+def refit_embedding_model():
+    logger.info("Refitting TF-IDF embedding model on stored corpus")
+    return run_reembed_job(create_reembed_job())
@@ -0,0 +1,137 @@
+from scipy import sparse
+from config.settings import Config
+from src.database.db import db
+from models import LabourLaw, LawPassage
+from src.embeddings.embedding_service import embedding_service
+from src.preprocessor.chunker import passage_chunker
+from src.search.filters import law_metadata
+from src.search.passage_index import passage_index
+from src.utils.logger import logger
+
+class PassageService:
+    
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or Config.PASSAGE_EMBED_BATCH_SIZE
+    
+    def _embed(self, texts, version=None):
+        matrices = []
+        
+        for start in range(0, len(texts), self.batch_size):
+            matrix, version = embedding_service.embed_batch(texts[start:start + self.batch_size], version)
+            if matrix is None:
+                return None, None
+            matrices.append(matrix)
+        
+        return sparse.vstack(matrices, format='csr'), version
+    
+    def _replace(self, laws, version=None):
+        spans = []
+        texts = []
+        for law in laws:
+            content = law.content or ''
+            for position, (start, end) in enumerate(passage_chunker.spans(content)):
+                spans.append((law, position, start, end))
+                texts.append(content[start:end])
+        
+        embeddings, version = self._embed(texts, version) if texts else (None, version)
+        if texts and embeddings is None:
+            raise RuntimeError(f"Failed to embed passages for laws {[law.id for law in laws]}")
+        
+        stale = LawPassage.query.filter(LawPassage.law_id.in_([law.id for law in laws]))
+        if version is not None:
+            stale = stale.filter(LawPassage.embedding_version == version)
+        stale_ids = [passage.id for passage in stale.with_entities(LawPassage.id)]
+        stale.delete(synchronize_session='fetch')
+        
+        passages = []
+        for row, (law, position, start, end) in enumerate(spans):
+            passage = LawPassage(law_id=law.id, position=position, start_offset=start, end_offset=end)
+            passage.set_embedding(embeddings[row], version)
+            passages.append(passage)
+        db.session.add_all(passages)
+        
+        return passages, spans, embeddings, version, stale_ids
+    
+    def write_laws(self, laws):
+        written = self._replace(laws)
+        db.session.flush()
+        return written
+    
+    def publish(self, written):
+        passages, spans, embeddings, version, stale_ids = written
+        
+        for passage_id in stale_ids:
+            passage_index.remove(passage_id)
+        for row, (passage, (law, _, _, _)) in enumerate(zip(passages, spans)):
+            passage_index.upsert(passage.id, embeddings[row], law_metadata(law), version)
+        
+        return len(passages)
+    
+    def index_laws(self, laws):
+        if not laws:
+            return 0
+        
+        try:
+            written = self.write_laws(laws)
+        except RuntimeError as e:
+            logger.error(str(e))
+            db.session.rollback()
+            return 0
+        
+        db.session.commit()
+        return self.publish(written)
+    
+    def stage_laws(self, laws, version):
+        if not laws:
+            return 0
+        
+        passages = self._replace(laws, version)[0]
+        db.session.flush()
+        return len(passages)
+    
+    def backfill(self, chunk_size=100):
+        version = embedding_service.active_version
+        current = db.session.query(LawPassage.law_id).filter(
+            LawPassage.embedding_version == version
+        )
+        
+        total = 0
+        last_id = 0
+        while True:
+            laws = LabourLaw.query.filter(
+                LabourLaw.id > last_id,
+                ~LabourLaw.id.in_(current)
+            ).order_by(LabourLaw.id).limit(chunk_size).all()
+            
+            if not laws:
+                break
+            
+            total += self.index_laws(laws)
+            last_id = laws[-1].id
+        
+        logger.info(f"Indexed {total} passages for laws missing {version} passages")
+        return total
+    
+    def best_passages(self, matches, limit, per_law=None):
+        per_law = per_law or Config.PASSAGES_PER_RESULT
+        if not matches:
+            return []
+        
+        scores = dict(matches)
+        passages = LawPassage.query.filter(LawPassage.id.in_(list(scores))).all()
+        
+        by_law = {}
+        for passage in passages:
+            by_law.setdefault(passage.law_id, []).append(
+                {'start': passage.start_offset, 'end': passage.end_offset, 'score': scores[passage.id]}
+            )
+        
+        ranked = []
+        for law_id, hits in by_law.items():
+            hits.sort(key=lambda h: h['score'], reverse=True)
+            ranked.append((law_id, hits[0]['score'], hits[:per_law]))
+        
+        ranked.sort(key=lambda m: m[1], reverse=True)
+        return ranked[:limit]
+
+passage_service = PassageService()
@@ -0,0 +1,38 @@
+import numpy as np
+from scipy import sparse
+
+INT8_MAX = 127
+
+def _scales(values):
+    scales = (values / INT8_MAX).astype(np.float32)
+    scales[scales == 0] = 1.0
+    return scales
+
+def quantize_rows(matrix):
+    matrix = matrix.tocsr()
+    lengths = np.diff(matrix.indptr)
+    
+    peaks = np.zeros(matrix.shape[0], dtype=np.float32)
+    nonempty = lengths > 0
+    if matrix.nnz:
+        peaks[nonempty] = np.maximum.reduceat(np.abs(matrix.data), matrix.indptr[:-1][nonempty])
+    scales = _scales(peaks)
+    
+    data = np.rint(matrix.data / np.repeat(scales, lengths)).astype(np.int8)
+    quantized = sparse.csr_matrix(
+        (data, matrix.indices.copy(), matrix.indptr.copy()),
+        shape=matrix.shape
+    )
+    return quantized, scales
+
+def dequantize_rows(quantized, scales):
+    lengths = np.diff(quantized.indptr)
+    data = quantized.data.astype(np.float32) * np.repeat(scales, lengths)
+    return sparse.csr_matrix((data, quantized.indices, quantized.indptr), shape=quantized.shape)
+
+def quantize_query(vector):
+    scale = _scales(np.array([np.abs(vector).max(initial=0.0)], dtype=np.float32))[0]
+    return np.rint(vector / scale).astype(np.int32), float(scale)
+
+def scores(quantized, scales, query, query_scale):
+    return (quantized @ query).astype(np.float32) * scales * query_scale
@@ -0,0 +1,53 @@
+import numpy as np
+from scipy import sparse
+
+INDEX_DTYPE = np.int32
+
+def to_csr(embedding):
+    if embedding is None:
+        return None
+    
+    if sparse.issparse(embedding):
+        matrix = embedding.tocsr()
+        if matrix.dtype != np.float32:
+            matrix = matrix.astype(np.float32)
+        return matrix
+    
+    vector = np.asarray(embedding, dtype=np.float32)
+    if vector.ndim == 1:
+        vector = vector.reshape(1, -1)
+    return sparse.csr_matrix(vector)
+
+def to_dense(embedding):
+    if embedding is None:
+        return None
+    if sparse.issparse(embedding):
+        return embedding.toarray().ravel().astype(np.float32, copy=False)
+    return np.asarray(embedding, dtype=np.float32).ravel()
+
+def encode(embedding, dtype='float32'):
+    row = to_csr(embedding)
+    row.sum_duplicates()
+    return (
+        row.data.astype(dtype).tobytes(),
+        row.indices.astype(INDEX_DTYPE).tobytes(),
+        row.shape[1]
+    )
+
+def decode(values, dtype, indices, dim):
+    data = np.frombuffer(values, dtype=dtype or 'float32')
+    if data.dtype != np.float32:
+        data = data.astype(np.float32)
+    
+    if indices is None:
+        return to_csr(data)
+    
+    cols = np.frombuffer(indices, dtype=INDEX_DTYPE)
+    indptr = np.array([0, cols.shape[0]], dtype=INDEX_DTYPE)
+    return sparse.csr_matrix((data, cols, indptr), shape=(1, dim))
+
+def normalize_rows(matrix):
+    matrix = to_csr(matrix)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sparse.diags((1.0 / norms).astype(np.float32)) @ matrix).tocsr()
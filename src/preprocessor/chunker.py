@@ -0,0 +1,90 @@
+import re
+import zlib
+from config.settings import Config
+
+SECTION_HEADING = re.compile(
+    r'(?:^|(?<=[.;:] ))(?=(?:CHAPTER|PART|SCHEDULE)\b|(?:Section\s+|Rule\s+)?\d{1,3}[A-Z]{0,2}\.\s+[A-Z(])',
+    re.MULTILINE
+)
+SECTION_ANCHOR_MODULUS = 4
+
+class PassageChunker:
+    
+    def __init__(self, size=None, overlap=None):
+        self.size = size or Config.PASSAGE_SIZE_CHARS
+        self.overlap = Config.PASSAGE_OVERLAP_CHARS if overlap is None else overlap
+    
+    def _boundary(self, text, start, end):
+        floor = start + self.size // 2
+        
+        for separator in ('\n', '. ', ' '):
+            cut = text.rfind(separator, floor, end)
+            if cut != -1:
+                return cut + len(separator)
+        return end
+    
+    def spans(self, text):
+        length = len(text or '')
+        if length == 0:
+            return []
+        if length <= self.size:
+            return [(0, length)]
+        
+        spans = []
+        start = 0
+        while start < length:
+            end = min(start + self.size, length)
+            if end < length:
+                end = self._boundary(text, start, end)
+            if length - end <= self.overlap:
+                end = length
+            spans.append((start, end))
+            
+            if end >= length:
+                break
+            
+            next_start = max(end - self.overlap, start + 1)
+            space = text.find(' ', next_start, end)
+            start = space + 1 if space != -1 else next_start
+        
+        return spans
+
+passage_chunker = PassageChunker()
+
+class SectionChunker:
+    
+    def __init__(self, max_chars=None):
+        self.max_chars = max_chars or Config.SUMMARY_CHUNK_CHARS
+        self.min_chars = self.max_chars // 4
+        self._splitter = PassageChunker(size=self.max_chars, overlap=0)
+    
+    def sections(self, text):
+        return [section for section in SECTION_HEADING.split(text or '') if section.strip()]
+    
+    def _is_anchor(self, section):
+        return zlib.crc32(section[:64].encode('utf-8')) % SECTION_ANCHOR_MODULUS == 0
+    
+    def chunks(self, text):
+        pieces = []
+        for section in self.sections(text):
+            if len(section) > self.max_chars:
+                pieces.extend(section[start:end] for start, end in self._splitter.spans(section))
+            else:
+                pieces.append(section)
+        
+        # Chunks close on section headings picked by their own text rather than on running
+        # length alone, so an amendment to one section leaves the other chunks byte-identical.
+        chunks = []
+        current = ''
+        for piece in pieces:
+            if current and (len(current) + len(piece) > self.max_chars
+                            or (len(current) >= self.min_chars and self._is_anchor(piece))):
+                chunks.append(current)
+                current = ''
+            current += piece
+        if current:
+            chunks.append(current)
+        
+        return chunks
+
+section_chunker = SectionChunker()
@@ -0,0 +1,50 @@
+import re
+import zlib
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+class MinHasher:
+    
+    TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+    
+    def __init__(self, num_perm=128, shingle_size=5, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    
+    def shingles(self, text):
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        if len(tokens) < self.shingle_size:
+            return {' '.join(tokens)} if tokens else set()
+        
+        return {
+            ' '.join(tokens[i:i + self.shingle_size])
+            for i in range(len(tokens) - self.shingle_size + 1)
+        }
+    
+    def signature(self, text):
+        shingles = self.shingles(text or '')
+        if not shingles:
+            return None
+        
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % MERSENNE_PRIME
+        return (permuted & MAX_HASH).min(axis=1).astype(np.uint32)
+    
+    @staticmethod
+    def jaccard(signature1, signature2):
+        if signature1 is None or signature2 is None or len(signature1) != len(signature2):
+            return 0.0
+        return float(np.mean(signature1 == signature2))
+
+minhasher = MinHasher()
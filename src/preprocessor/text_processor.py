@@ -1,7 +1,9 @@
 import re
 import hashlib
+from datetime import datetime
 from bs4 import BeautifulSoup
 from langdetect import detect, LangDetectException
+from src.preprocessor.minhash import minhasher
 from src.utils.logger import logger
 
 class TextProcessor:
@@ -26,6 +28,11 @@ class TextProcessor:
         r'skip to navigation',
     ]
     
+    DATE_FORMATS = [
+        '%d-%m-%Y', '%d/%m/%Y', '%d-%m-%y', '%d/%m/%y',
+        '%d %B %Y', '%B %d, %Y', '%B %d %Y',
+    ]
+    
     def __init__(self):
         self.boilerplate_regex = re.compile(
             '|'.join(self.BOILERPLATE_PATTERNS),
@@ -99,6 +106,20 @@ class TextProcessor:
         normalized = re.sub(r'\s+', ' ', text.lower().strip())
         return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
     
+    def parse_date(self, value):
+        if not value:
+            return None
+        
+        value = re.sub(r'\s+', ' ', value.strip())
+        for date_format in self.DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        
+        logger.debug(f"Could not parse publication date '{value}'")
+        return None
+    
     def extract_metadata(self, html_content, url=""):
         metadata = {
             'title': '',
@@ -151,22 +172,31 @@ class TextProcessor:
         
         return metadata
     
-    def process(self, html_content, url=""):
+    def fingerprint(self, html_content):
         cleaned_text = self.clean_html(html_content)
+        return cleaned_text, self.generate_content_hash(cleaned_text)
+    
+    def process(self, html_content, url="", cleaned_text=None, content_hash=None):
+        if cleaned_text is None:
+            cleaned_text = self.clean_html(html_content)
         
         metadata = self.extract_metadata(html_content, url)
         
         language = self.detect_language(cleaned_text)
         
-        content_hash = self.generate_content_hash(cleaned_text)
+        if content_hash is None:
+            content_hash = self.generate_content_hash(cleaned_text)
+        
+        minhash = minhasher.signature(cleaned_text)
         
         return {
             'content': cleaned_text,
             'title': metadata['title'],
-            'publication_date': metadata['publication_date'],
+            'publication_date': self.parse_date(metadata['publication_date']),
             'category': metadata['category'],
             'language': language,
-            'content_hash': content_hash
+            'content_hash': content_hash,
+            'minhash': minhash
         }
 
 text_processor = TextProcessor()
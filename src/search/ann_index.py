@@ -0,0 +1,276 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy import sparse
+from config.settings import Config
+from src.embeddings import sparse as sparse_embeddings
+from src.search.vector_index import vector_index
+from src.utils.logger import logger
+
+class IVFIndex:
+    
+    def __init__(self, path=None, nprobe=None, min_train_size=None, kmeans_iterations=10,
+                 max_training_sample=20000):
+        self.path = path or os.path.join(Config.INDEX_DIR, 'ivf.npz')
+        self.nprobe = nprobe or Config.ANN_NPROBE
+        self.min_train_size = Config.ANN_MIN_TRAIN_SIZE if min_train_size is None else min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.max_training_sample = max_training_sample
+        self._lock = threading.RLock()
+        self._reset()
+        self._load()
+        vector_index.add_listener(self._on_vector_change)
+    
+    def _reset(self):
+        self._version = None
+        self._centroids = None
+        self._list_by_id = {}
+        self._lists = []
+        self._trained_size = 0
+        self._seen_generation = None
+        self._dirty = False
+    
+    @property
+    def trained(self):
+        return self._centroids is not None
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                centroids = data['centroids']
+                ids = data['ids']
+                assignments = data['assignments']
+                version = str(data['version'])
+                trained_size = int(data['trained_size'])
+            
+            with self._lock:
+                self._reset()
+                self._version = version
+                self._centroids = centroids
+                self._trained_size = trained_size
+                self._lists = [set() for _ in range(centroids.shape[0])]
+                for law_id, list_no in zip(ids.tolist(), assignments.tolist()):
+                    self._list_by_id[law_id] = list_no
+                    self._lists[list_no].add(law_id)
+            
+            logger.info(f"Loaded IVF index for {version}: {len(ids)} laws in {centroids.shape[0]} lists")
+        except Exception as e:
+            logger.error(f"Failed to load IVF index from {self.path}: {e}")
+            self._reset()
+    
+    def save(self):
+        with self._lock:
+            if not self.trained or not self._dirty:
+                return
+            
+            ids = np.fromiter(self._list_by_id.keys(), dtype=np.int64, count=len(self._list_by_id))
+            assignments = np.fromiter(self._list_by_id.values(), dtype=np.int32, count=len(self._list_by_id))
+            
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp.npz'
+            np.savez(
+                tmp_path,
+                centroids=self._centroids,
+                ids=ids,
+                assignments=assignments,
+                version=np.array(self._version),
+                trained_size=np.array(self._trained_size)
+            )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        
+        logger.info(f"Saved IVF index to {self.path}")
+    
+    def _kmeans(self, vectors, nlist):
+        rng = np.random.default_rng(0)
+        n = vectors.shape[0]
+        centroids = vectors[rng.choice(n, nlist, replace=False)].toarray()
+        
+        for _ in range(self.kmeans_iterations):
+            assignments = np.asarray(np.argmax(vectors @ centroids.T, axis=1)).ravel()
+            
+            membership = sparse.csr_matrix(
+                (np.ones(n, dtype=np.float32), (assignments, np.arange(n))),
+                shape=(nlist, n)
+            )
+            centroids = (membership @ vectors).toarray()
+            
+            empty = np.flatnonzero(np.bincount(assignments, minlength=nlist) == 0)
+            if empty.size:
+                centroids[empty] = vectors[rng.choice(n, empty.size, replace=False)].toarray()
+            
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+        
+        return centroids.astype(np.float32)
+    
+    def _assign(self, vectors):
+        return np.asarray(np.argmax(vectors @ self._centroids.T, axis=1)).ravel()
+    
+    def train(self):
+        generation = vector_index.generation
+        version, ids, matrix = vector_index.snapshot()
+        started = time.perf_counter()
+        
+        with self._lock:
+            self._reset()
+            self._version = version
+            
+            if matrix is None or ids.shape[0] < max(self.min_train_size, 1):
+                return False
+            
+            nlist = max(1, int(np.sqrt(ids.shape[0])))
+            sample = matrix
+            if ids.shape[0] > self.max_training_sample:
+                rng = np.random.default_rng(0)
+                sample = matrix[rng.choice(ids.shape[0], self.max_training_sample, replace=False)]
+            
+            self._centroids = self._kmeans(sample, nlist)
+            self._lists = [set() for _ in range(nlist)]
+            self._trained_size = ids.shape[0]
+            self._add_many(ids, matrix)
+            self._seen_generation = generation
+            self._dirty = True
+        
+        logger.info(f"Trained IVF index for {version}: {ids.shape[0]} laws in {nlist} lists "
+                    f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+        self.save()
+        return True
+    
+    def _add_many(self, ids, vectors):
+        for law_id, list_no in zip(ids.tolist(), self._assign(vectors).tolist()):
+            self._discard(law_id)
+            self._list_by_id[law_id] = list_no
+            self._lists[list_no].add(law_id)
+    
+    def _discard(self, law_id):
+        previous = self._list_by_id.pop(law_id, None)
+        if previous is not None:
+            self._lists[previous].discard(law_id)
+    
+    def _reconcile(self, generation):
+        ids = vector_index.ids()
+        
+        with self._lock:
+            known = np.fromiter(self._list_by_id.keys(), dtype=np.int64, count=len(self._list_by_id))
+        
+        missing = ids[~np.isin(ids, known)]
+        stale = known[~np.isin(known, ids)]
+        missing_ids, vectors = vector_index.vectors_for(missing.tolist())
+        
+        with self._lock:
+            for law_id in stale.tolist():
+                self._discard(law_id)
+            if vectors is not None:
+                self._add_many(missing_ids, vectors)
+            if missing.size or stale.size:
+                self._dirty = True
+            self._seen_generation = generation
+    
+    def _on_vector_change(self, law_id, vector, version):
+        with self._lock:
+            if not self.trained or version != self._version:
+                return
+            if vector is None:
+                self._discard(law_id)
+            else:
+                self._add_many(np.array([law_id], dtype=np.int64), vector)
+            self._dirty = True
+    
+    def ensure_ready(self):
+        vector_index.ensure_ready()
+        version = vector_index.version
+        size = vector_index.size
+        generation = vector_index.generation
+        
+        if size < max(self.min_train_size, 1):
+            return False
+        
+        if not self.trained or self._version != version or size > 4 * self._trained_size:
+            return self.train()
+        
+        if generation != self._seen_generation:
+            self._reconcile(generation)
+        
+        return True
+    
+    def search(self, query_embedding, version=None, limit=10, min_score=0.0, nprobe=None):
+        if query_embedding is None:
+            return []
+        
+        if not self.ensure_ready():
+            return vector_index.search(query_embedding, version=version, limit=limit, min_score=min_score)
+        
+        query = sparse_embeddings.to_dense(query_embedding)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        
+        with self._lock:
+            if version is not None and version != self._version:
+                return []
+            if query.shape[0] != self._centroids.shape[1]:
+                return []
+            
+            nprobe = min(nprobe or self.nprobe, self._centroids.shape[0])
+            centroid_scores = self._centroids @ query
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            candidate_ids = [law_id for list_no in probes for law_id in self._lists[list_no]]
+        
+        ids, vectors = vector_index.vectors_for(candidate_ids)
+        if vectors is None:
+            return []
+        
+        scores = vectors @ query
+        keep = np.flatnonzero(scores >= min_score)
+        if keep.size == 0:
+            return []
+        
+        top = keep[np.argsort(-scores[keep])][:limit]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+    
+    def evaluate_recall(self, sample_size=200, k=10, nprobe=None, min_score=0.0):
+        version, ids, matrix = vector_index.snapshot()
+        if matrix is None or not self.ensure_ready():
+            return None
+        
+        rng = np.random.default_rng(0)
+        queries = rng.choice(ids.shape[0], min(sample_size, ids.shape[0]), replace=False)
+        
+        hits = 0
+        expected = 0
+        ann_time = 0.0
+        exact_time = 0.0
+        
+        for row in queries:
+            query = matrix[row]
+            
+            started = time.perf_counter()
+            exact = vector_index.search(query, version=version, limit=k, min_score=min_score)
+            exact_time += time.perf_counter() - started
+            
+            started = time.perf_counter()
+            approximate = self.search(query, version=version, limit=k, min_score=min_score, nprobe=nprobe)
+            ann_time += time.perf_counter() - started
+            
+            exact_ids = {law_id for law_id, _ in exact}
+            hits += len(exact_ids & {law_id for law_id, _ in approximate})
+            expected += len(exact_ids)
+        
+        return {
+            'queries': int(queries.shape[0]),
+            'k': k,
+            'nprobe': nprobe or self.nprobe,
+            'min_score': min_score,
+            'lists': int(self._centroids.shape[0]),
+            'recall': hits / expected if expected else 1.0,
+            'ann_ms_per_query': ann_time * 1000 / queries.shape[0],
+            'exact_ms_per_query': exact_time * 1000 / queries.shape[0]
+        }
+
+ann_index = IVFIndex()
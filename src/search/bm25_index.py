@@ -0,0 +1,282 @@
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import Counter
+from config.settings import Config
+from src.database.db import db
+from models import LabourLaw
+from src.search.filters import NO_DATE, date_ordinal
+from src.utils.logger import logger
+
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'under', 'with'
+])
+
+class BM25Index:
+    
+    TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+    
+    def __init__(self, path=None, k1=None, b=None, title_weight=None, sync_interval=None):
+        self.path = path or os.path.join(Config.INDEX_DIR, 'bm25.pkl')
+        self.k1 = Config.BM25_K1 if k1 is None else k1
+        self.b = Config.BM25_B if b is None else b
+        self.title_weight = Config.BM25_TITLE_WEIGHT if title_weight is None else title_weight
+        self.sync_interval = Config.VECTOR_INDEX_SYNC_SECONDS if sync_interval is None else sync_interval
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._reset()
+    
+    def _reset(self):
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_len = {}
+        self._doc_meta = {}
+        self._total_len = 0
+        self._loaded = False
+        self._dirty = False
+        self._synced_at = 0.0
+        self._watermark = None
+        self._db_count = 0
+    
+    @property
+    def size(self):
+        return len(self._doc_len)
+    
+    @property
+    def generation(self):
+        return self._generation
+    
+    def tokenize(self, text):
+        return self.TOKEN_PATTERN.findall((text or '').lower())
+    
+    def _put(self, law_id, title, content, metadata):
+        self._delete(law_id)
+        
+        counts = Counter(self.tokenize(content))
+        for term in self.tokenize(title):
+            counts[term] += self.title_weight
+        
+        if not counts:
+            return
+        
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[law_id] = tf
+        
+        length = sum(counts.values())
+        self._doc_terms[law_id] = tuple(counts)
+        self._doc_len[law_id] = length
+        self._doc_meta[law_id] = metadata
+        self._total_len += length
+    
+    def _delete(self, law_id):
+        terms = self._doc_terms.pop(law_id, None)
+        if terms is None:
+            return
+        
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(law_id, None)
+                if not posting:
+                    del self._postings[term]
+        
+        self._doc_meta.pop(law_id, None)
+        self._total_len -= self._doc_len.pop(law_id)
+    
+    def _load_rows(self, query):
+        for law_id, title, content, category, source, language, published, updated_at in query.yield_per(500):
+            self._put(law_id, title, content, (category, source, language, date_ordinal(published)))
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+    
+    def _rows_query(self):
+        return db.session.query(
+            LabourLaw.id,
+            LabourLaw.title,
+            LabourLaw.content,
+            LabourLaw.category,
+            LabourLaw.source,
+            LabourLaw.language,
+            LabourLaw.publication_date,
+            LabourLaw.updated_at
+        )
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        
+        try:
+            with open(self.path, 'rb') as f:
+                state = pickle.load(f)
+            
+            if 'doc_meta' not in state:
+                logger.info(f"BM25 index at {self.path} has no filter metadata; rebuilding")
+                return False
+            
+            self._postings = state['postings']
+            self._doc_terms = state['doc_terms']
+            self._doc_len = state['doc_len']
+            self._doc_meta = state['doc_meta']
+            self._total_len = state['total_len']
+            self._watermark = state['watermark']
+            self._db_count = state['db_count']
+            
+            logger.info(f"Loaded BM25 index from {self.path}: {self.size} laws, {len(self._postings)} terms")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load BM25 index from {self.path}: {e}")
+            self._reset()
+            return False
+    
+    def save(self):
+        with self._lock:
+            if not self._loaded or not self._dirty:
+                return
+            
+            state = {
+                'postings': self._postings,
+                'doc_terms': self._doc_terms,
+                'doc_len': self._doc_len,
+                'doc_meta': self._doc_meta,
+                'total_len': self._total_len,
+                'watermark': self._watermark,
+                'db_count': self._db_count
+            }
+            
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        
+        logger.info(f"Saved BM25 index to {self.path}")
+    
+    def build(self):
+        started = time.perf_counter()
+        
+        with self._lock:
+            self._reset()
+            self._db_count = LabourLaw.query.count()
+            self._load_rows(self._rows_query().order_by(LabourLaw.id))
+            self._loaded = True
+            self._dirty = True
+            self._synced_at = time.monotonic()
+            self._generation += 1
+        
+        logger.info(f"Built BM25 index: {self.size} laws, {len(self._postings)} terms in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        self.save()
+    
+    def sync(self):
+        with self._lock:
+            count, max_updated = db.session.query(
+                db.func.count(LabourLaw.id),
+                db.func.max(LabourLaw.updated_at)
+            ).one()
+            
+            if count < self._db_count:
+                self.build()
+                return
+            
+            if count != self._db_count or (max_updated and (self._watermark is None or max_updated > self._watermark)):
+                query = self._rows_query()
+                if self._watermark is not None:
+                    query = query.filter(LabourLaw.updated_at >= self._watermark)
+                self._load_rows(query)
+                self._db_count = count
+                self._dirty = True
+                self._generation += 1
+            
+            self._synced_at = time.monotonic()
+    
+    def ensure_ready(self):
+        if not self._loaded:
+            with self._lock:
+                if self._loaded:
+                    return
+                if self._load():
+                    self._loaded = True
+                    self.sync()
+                    self.save()
+                else:
+                    self.build()
+        elif time.monotonic() - self._synced_at > self.sync_interval:
+            self.sync()
+    
+    def add(self, law_id, title, content, metadata=None):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._put(law_id, title, content, metadata or (None, None, None, NO_DATE))
+            self._dirty = True
+    
+    def remove(self, law_id):
+        with self._lock:
+            self._delete(law_id)
+            self._dirty = True
+    
+    def _candidates(self, terms):
+        postings = [self._postings.get(term) for term in terms]
+        required = [p for term, p in zip(terms, postings) if term not in STOPWORDS] or postings
+        
+        if required and all(required):
+            required.sort(key=len)
+            smallest, others = required[0], required[1:]
+            matches = [law_id for law_id in smallest if all(law_id in p for p in others)]
+            if matches:
+                return matches
+        
+        candidates = set()
+        for posting in postings:
+            if posting:
+                candidates.update(posting)
+        return candidates
+    
+    def search(self, query, limit=10, filters=None):
+        terms = list(dict.fromkeys(self.tokenize(query)))
+        if not terms or limit <= 0:
+            return []
+        
+        self.ensure_ready()
+        
+        with self._lock:
+            if not self._doc_len:
+                return []
+            
+            candidates = self._candidates(terms)
+            if filters and filters.active:
+                doc_meta = self._doc_meta
+                candidates = [law_id for law_id in candidates if filters.matches(doc_meta[law_id])]
+            if not candidates:
+                return []
+            
+            n = len(self._doc_len)
+            avgdl = self._total_len / n
+            weighted = []
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting:
+                    idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                    weighted.append((posting, idf))
+            
+            k1, b = self.k1, self.b
+            doc_len = self._doc_len
+            scores = []
+            for law_id in candidates:
+                norm = k1 * (1 - b + b * doc_len[law_id] / avgdl)
+                score = 0.0
+                for posting, idf in weighted:
+                    tf = posting.get(law_id)
+                    if tf:
+                        score += idf * tf * (k1 + 1) / (tf + norm)
+                scores.append((law_id, score))
+        
+        return heapq.nlargest(limit, scores, key=lambda m: m[1])
+
+bm25_index = BM25Index()
@@ -0,0 +1,64 @@
+from datetime import date
+
+NO_DATE = 0
+FILTER_FIELDS = ('category', 'source', 'language')
+
+def date_ordinal(value):
+    return value.toordinal() if value else NO_DATE
+
+def law_metadata(law):
+    return (law.category, law.source, law.language, date_ordinal(law.publication_date))
+
+class SearchFilters:
+    
+    def __init__(self, category=None, source=None, language=None, date_from=None, date_to=None):
+        self.category = category or None
+        self.source = source or None
+        self.language = language or None
+        self.date_from = self._parse_date(date_from, 'date_from')
+        self.date_to = self._parse_date(date_to, 'date_to')
+        
+        if self.date_from and self.date_to and self.date_from > self.date_to:
+            raise ValueError("date_from must not be later than date_to")
+    
+    @staticmethod
+    def _parse_date(value, name):
+        if not value:
+            return None
+        if isinstance(value, date):
+            return value
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"Invalid {name} '{value}', expected YYYY-MM-DD")
+    
+    @property
+    def active(self):
+        return any(self.key())
+    
+    def key(self):
+        return (self.category, self.source, self.language, self.date_from, self.date_to)
+    
+    def matches(self, metadata):
+        for field, value in zip(FILTER_FIELDS, metadata):
+            wanted = getattr(self, field)
+            if wanted and value != wanted:
+                return False
+        
+        published = metadata[3]
+        if self.date_from and published < self.date_from.toordinal():
+            return False
+        if self.date_to and not NO_DATE < published <= self.date_to.toordinal():
+            return False
+        return True
+    
+    def to_dict(self):
+        return {
+            'category': self.category,
+            'source': self.source,
+            'language': self.language,
+            'date_from': self.date_from.isoformat() if self.date_from else None,
+            'date_to': self.date_to.isoformat() if self.date_to else None
+        }
+
+NO_FILTERS = SearchFilters()
@@ -0,0 +1,140 @@
+import threading
+import time
+import numpy as np
+from config.settings import Config
+from src.database.db import db
+from models import LabourLaw
+from src.preprocessor.minhash import minhasher
+from src.utils.logger import logger
+
+class LSHIndex:
+    
+    def __init__(self, bands=None, sync_interval=None):
+        self.bands = bands or Config.MINHASH_BANDS
+        self.rows = minhasher.num_perm // self.bands
+        self.sync_interval = Config.VECTOR_INDEX_SYNC_SECONDS if sync_interval is None else sync_interval
+        self._lock = threading.RLock()
+        self._reset()
+    
+    def _reset(self):
+        self._tables = [{} for _ in range(self.bands)]
+        self._signatures = {}
+        self._loaded = False
+        self._synced_at = 0.0
+        self._watermark = None
+        self._db_count = 0
+    
+    @property
+    def size(self):
+        return len(self._signatures)
+    
+    def _band_keys(self, signature):
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+    
+    def _put(self, law_id, signature):
+        self._delete(law_id)
+        self._signatures[law_id] = signature
+        for table, key in zip(self._tables, self._band_keys(signature)):
+            table.setdefault(key, set()).add(law_id)
+    
+    def _delete(self, law_id):
+        signature = self._signatures.pop(law_id, None)
+        if signature is None:
+            return
+        
+        for table, key in zip(self._tables, self._band_keys(signature)):
+            bucket = table.get(key)
+            if bucket:
+                bucket.discard(law_id)
+                if not bucket:
+                    del table[key]
+    
+    def _load_rows(self, query):
+        for law_id, minhash, updated_at in query.yield_per(1000):
+            if minhash:
+                self._put(law_id, np.frombuffer(minhash, dtype=np.uint32))
+            else:
+                self._delete(law_id)
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+    
+    def _rows_query(self):
+        return db.session.query(LabourLaw.id, LabourLaw.minhash, LabourLaw.updated_at)
+    
+    def build(self):
+        started = time.perf_counter()
+        
+        with self._lock:
+            self._reset()
+            self._db_count = LabourLaw.query.count()
+            self._load_rows(self._rows_query().order_by(LabourLaw.id))
+            self._loaded = True
+            self._synced_at = time.monotonic()
+        
+        logger.info(f"Built MinHash LSH index: {self.size} laws, {self.bands} bands x {self.rows} rows in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    def sync(self):
+        with self._lock:
+            count, max_updated = db.session.query(
+                db.func.count(LabourLaw.id),
+                db.func.max(LabourLaw.updated_at)
+            ).one()
+            
+            if count < self._db_count:
+                self.build()
+                return
+            
+            if count != self._db_count or (max_updated and (self._watermark is None or max_updated > self._watermark)):
+                query = self._rows_query()
+                if self._watermark is not None:
+                    query = query.filter(LabourLaw.updated_at >= self._watermark)
+                self._load_rows(query)
+                self._db_count = count
+            
+            self._synced_at = time.monotonic()
+    
+    def ensure_ready(self):
+        if not self._loaded:
+            self.build()
+        elif time.monotonic() - self._synced_at > self.sync_interval:
+            self.sync()
+    
+    def add(self, law_id, signature):
+        with self._lock:
+            if not self._loaded:
+                return
+            if signature is None:
+                self._delete(law_id)
+            else:
+                self._put(law_id, np.asarray(signature, dtype=np.uint32))
+    
+    def remove(self, law_id):
+        with self._lock:
+            self._delete(law_id)
+    
+    def query(self, signature, threshold=0.0, limit=None):
+        if signature is None:
+            return []
+        
+        self.ensure_ready()
+        signature = np.asarray(signature, dtype=np.uint32)
+        
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._tables, self._band_keys(signature)):
+                candidates.update(table.get(key, ()))
+            
+            matches = [
+                (law_id, minhasher.jaccard(signature, self._signatures[law_id]))
+                for law_id in candidates
+            ]
+        
+        matches = [m for m in matches if m[1] >= threshold]
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches[:limit] if limit else matches
+
+lsh_index = LSHIndex()
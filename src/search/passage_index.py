@@ -0,0 +1,40 @@
+from src.database.db import db
+from models import LabourLaw, LawPassage
+from src.search.vector_index import VectorIndex
+
+class PassageIndex(VectorIndex):
+    
+    label = 'passage index'
+    
+    def _id_column(self):
+        return LawPassage.id
+    
+    def _watermark_column(self):
+        return LawPassage.created_at
+    
+    def _rows_query(self, version):
+        return db.session.query(
+            LawPassage.id,
+            LabourLaw.category,
+            LabourLaw.source,
+            LabourLaw.language,
+            LabourLaw.publication_date,
+            LawPassage.embedding,
+            LawPassage.embedding_indices,
+            LawPassage.embedding_dim,
+            LawPassage.embedding_dtype,
+            LawPassage.created_at
+        ).join(
+            LabourLaw, LabourLaw.id == LawPassage.law_id
+        ).filter(LawPassage.embedding_version == version)
+    
+    def _vectors_query(self, ids, version):
+        return db.session.query(
+            LawPassage.id,
+            LawPassage.embedding,
+            LawPassage.embedding_indices,
+            LawPassage.embedding_dim,
+            LawPassage.embedding_dtype
+        ).filter(LawPassage.id.in_(ids), LawPassage.embedding_version == version)
+
+passage_index = PassageIndex()
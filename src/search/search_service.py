@@ -0,0 +1,145 @@
+from config.settings import Config
+from models import LabourLaw
+from src.embeddings.embedding_service import embedding_service
+from src.embeddings.passage_service import passage_service
+from src.search.bm25_index import bm25_index
+from src.search.filters import NO_FILTERS
+from src.search.passage_index import passage_index
+from src.search.query_cache import LRUCache
+
+SEARCH_MODES = ('semantic', 'keyword', 'hybrid')
+
+class SearchService:
+    
+    def __init__(self, rrf_k=None, hybrid_depth=None, cache_size=None, cache_ttl=None):
+        self.rrf_k = rrf_k or Config.SEARCH_RRF_K
+        self.hybrid_depth = hybrid_depth or Config.SEARCH_HYBRID_DEPTH
+        cache_size = cache_size or Config.SEARCH_CACHE_SIZE
+        cache_ttl = Config.SEARCH_CACHE_TTL_SECONDS if cache_ttl is None else cache_ttl
+        self.vector_cache = LRUCache(cache_size, cache_ttl)
+        self.result_cache = LRUCache(cache_size, cache_ttl)
+        self._generation = 0
+    
+    @property
+    def generation(self):
+        return self._generation
+    
+    def invalidate(self):
+        self._generation += 1
+        self.result_cache.clear()
+    
+    def cache_stats(self):
+        return {
+            'generation': self._generation,
+            'query_vectors': self.vector_cache.stats(),
+            'results': self.result_cache.stats()
+        }
+    
+    @staticmethod
+    def normalize_query(query):
+        return ' '.join((query or '').lower().split())
+    
+    def embed_query(self, query):
+        key = (self.normalize_query(query), embedding_service.active_version)
+        
+        cached = self.vector_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        query_embedding, embedding_version = embedding_service.embed(key[0])
+        if query_embedding is not None:
+            self.vector_cache.put(key, (query_embedding, embedding_version))
+        return query_embedding, embedding_version
+    
+    def semantic(self, query, limit=10, min_score=None, filters=None):
+        query_embedding, embedding_version = self.embed_query(query)
+        
+        if query_embedding is None:
+            return None
+        
+        hits = passage_index.search(
+            query_embedding,
+            version=embedding_version,
+            limit=limit * Config.PASSAGE_SEARCH_FANOUT,
+            min_score=Config.SEARCH_MIN_SCORE if min_score is None else min_score,
+            filters=filters
+        )
+        return passage_service.best_passages(hits, limit)
+    
+    def keyword(self, query, limit=10, filters=None):
+        return [(law_id, score, []) for law_id, score in bm25_index.search(query, limit=limit, filters=filters)]
+    
+    def hybrid(self, query, limit=10, filters=None):
+        depth = max(limit, self.hybrid_depth)
+        # Passages that share no terms with the query score 0.0; they are no evidence for a
+        # law, so laws found only by keyword come back without passages.
+        semantic = []
+        for law_id, score, hits in self.semantic(query, depth, min_score=0.0, filters=filters) or []:
+            hits = [hit for hit in hits if hit['score'] > 0]
+            if hits:
+                semantic.append((law_id, score, hits))
+        rankings = [self.keyword(query, depth, filters), semantic]
+        
+        fused = {}
+        passages = {}
+        for ranking in rankings:
+            for rank, (law_id, _, hits) in enumerate(ranking, start=1):
+                fused[law_id] = fused.get(law_id, 0.0) + 1.0 / (self.rrf_k + rank)
+                if hits:
+                    passages[law_id] = hits
+        
+        ranked = sorted(fused.items(), key=lambda m: m[1], reverse=True)[:limit]
+        return [(law_id, score, passages.get(law_id, [])) for law_id, score in ranked]
+    
+    def _search(self, query, limit, mode, filters):
+        if mode == 'semantic':
+            return self.semantic(query, limit, filters=filters)
+        if mode == 'keyword':
+            return self.keyword(query, limit, filters)
+        if mode == 'hybrid':
+            return self.hybrid(query, limit, filters)
+        
+        raise ValueError(f"Unknown search mode '{mode}' (expected one of: {', '.join(SEARCH_MODES)})")
+    
+    def _index_generations(self, mode):
+        # The CLI and the scheduler write to the same database from other processes;
+        # syncing the indexes first turns their changes into a new cache key.
+        generations = []
+        if mode in ('semantic', 'hybrid'):
+            passage_index.ensure_ready()
+            generations.append(passage_index.generation)
+        if mode in ('keyword', 'hybrid'):
+            bm25_index.ensure_ready()
+            generations.append(bm25_index.generation)
+        return tuple(generations)
+    
+    def search(self, query, limit=10, mode=None, filters=None):
+        mode = mode or Config.SEARCH_DEFAULT_MODE
+        filters = filters or NO_FILTERS
+        query = self.normalize_query(query)
+        key = (
+            query, limit, mode, filters.key(),
+            self._generation, self._index_generations(mode), embedding_service.active_version
+        )
+        
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        
+        matches = self._search(query, limit, mode, filters)
+        if matches is not None:
+            self.result_cache.put(key, tuple(matches))
+        return matches
+    
+    def load_laws(self, matches):
+        if not matches:
+            return []
+        
+        laws = {
+            law.id: law
+            for law in LabourLaw.query.filter(LabourLaw.id.in_([m[0] for m in matches]))
+        }
+        
+        return [(laws[law_id], score, passages) for law_id, score, passages in matches if law_id in laws]
+
+search_service = SearchService()
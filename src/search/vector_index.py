@@ -0,0 +1,579 @@
+import threading
+import time
+import numpy as np
+from scipy import sparse
+from config.settings import Config
+from src.database.db import db
+from models import LabourLaw
+from src.embeddings import sparse as sparse_embeddings
+from src.embeddings import quantization
+from src.embeddings.embedding_service import embedding_service
+from src.search.filters import FILTER_FIELDS, NO_DATE, NO_FILTERS, date_ordinal
+from src.utils.logger import logger
+
+METADATA_DTYPE = np.dtype([
+    ('category', np.int32),
+    ('source', np.int32),
+    ('language', np.int32),
+    ('published', np.int32)
+])
+
+class VectorIndex:
+    
+    label = 'vector index'
+    
+    def __init__(self, compact_threshold=1024, sync_interval=None, quantization=None, rerank_factor=None):
+        self.compact_threshold = compact_threshold
+        self.sync_interval = Config.VECTOR_INDEX_SYNC_SECONDS if sync_interval is None else sync_interval
+        self.quantization = quantization or Config.VECTOR_QUANTIZATION
+        self.rerank_factor = Config.QUANTIZED_RERANK_FACTOR if rerank_factor is None else rerank_factor
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._generation = 0
+        self._reset(None)
+    
+    def _reset(self, version):
+        self._version = version
+        self._dim = None
+        self._base = None
+        self._base_scales = None
+        self._base_ids = np.empty(0, dtype=np.int64)
+        self._base_meta = np.empty(0, dtype=METADATA_DTYPE)
+        self._base_alive = np.empty(0, dtype=bool)
+        self._pending_rows = []
+        self._pending_ids = []
+        self._pending_meta = []
+        self._pending_alive = []
+        self._pending_matrix = None
+        self._codes = {field: {} for field in FILTER_FIELDS}
+        self._row_by_id = {}
+        self._size = 0
+        self._loaded = False
+        self._synced_at = 0.0
+        self._watermark = None
+        self._db_count = 0
+        self._max_id = 0
+    
+    @property
+    def size(self):
+        return self._size
+    
+    @property
+    def version(self):
+        return self._version
+    
+    @property
+    def generation(self):
+        return self._generation
+    
+    @property
+    def quantized(self):
+        return self.quantization == 'int8'
+    
+    @property
+    def memory_bytes(self):
+        with self._lock:
+            total = 0
+            for matrix in (self._base, self._pending_block()):
+                if matrix is not None:
+                    total += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+            if self._base_scales is not None:
+                total += self._base_scales.nbytes
+            return total
+    
+    @property
+    def nnz(self):
+        with self._lock:
+            base = self._base.nnz if self._base is not None else 0
+            return base + sum(row.nnz for row in self._pending_rows)
+    
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+    
+    def _notify(self, law_id, vector):
+        for listener in self._listeners:
+            try:
+                listener(law_id, vector, self._version)
+            except Exception as e:
+                logger.error(f"Vector index listener failed for law {law_id}: {e}")
+    
+    def _normalize(self, embedding):
+        return sparse_embeddings.normalize_rows(embedding)
+    
+    def _normalize_query(self, embedding):
+        vector = sparse_embeddings.to_dense(embedding)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector
+    
+    def _encode_metadata(self, metadata):
+        if metadata is None:
+            metadata = (None, None, None, NO_DATE)
+        
+        row = []
+        for field, value in zip(FILTER_FIELDS, metadata):
+            codes = self._codes[field]
+            row.append(codes.setdefault(value, len(codes)))
+        row.append(metadata[3])
+        return tuple(row)
+    
+    def _filter_mask(self, meta, filters):
+        mask = np.ones(meta.shape[0], dtype=bool)
+        
+        for field in FILTER_FIELDS:
+            value = getattr(filters, field)
+            if value:
+                code = self._codes[field].get(value)
+                if code is None:
+                    return None
+                mask &= meta[field] == code
+        
+        published = meta['published']
+        if filters.date_from:
+            mask &= published >= filters.date_from.toordinal()
+        if filters.date_to:
+            mask &= (published > NO_DATE) & (published <= filters.date_to.toordinal())
+        
+        return mask
+    
+    @property
+    def _base_rows(self):
+        return self._base_ids.shape[0]
+    
+    def _pending_block(self):
+        if not self._pending_rows:
+            return None
+        if self._pending_matrix is None:
+            self._pending_matrix = sparse.vstack(self._pending_rows, format='csr')
+        return self._pending_matrix
+    
+    def _put(self, law_id, vector, metadata):
+        if self._dim is None:
+            self._dim = vector.shape[1]
+        elif vector.shape[1] != self._dim:
+            logger.warning(f"Skipping id {law_id} in {self.label}: dimension {vector.shape[1]} "
+                           f"does not match index dimension {self._dim}")
+            return
+        
+        self._delete(law_id)
+        
+        self._row_by_id[law_id] = self._base_rows + len(self._pending_rows)
+        self._pending_rows.append(vector)
+        self._pending_ids.append(law_id)
+        self._pending_meta.append(self._encode_metadata(metadata))
+        self._pending_alive.append(True)
+        self._pending_matrix = None
+        self._size += 1
+        
+        if len(self._pending_rows) >= self.compact_threshold:
+            self._compact()
+    
+    def _delete(self, law_id):
+        row = self._row_by_id.pop(law_id, None)
+        if row is None:
+            return
+        
+        if row < self._base_rows:
+            self._base_alive[row] = False
+        else:
+            self._pending_alive[row - self._base_rows] = False
+        self._size -= 1
+        
+        if self._base_rows and self._size < 0.75 * (self._base_rows + len(self._pending_rows)):
+            self._compact()
+    
+    def _set_base(self, matrix, ids, meta, scales=None):
+        if self.quantized and scales is None:
+            matrix, scales = quantization.quantize_rows(matrix)
+        
+        self._base = matrix
+        self._base_scales = scales
+        self._base_ids = ids
+        self._base_meta = meta
+        self._base_alive = np.ones(ids.shape[0], dtype=bool)
+        self._pending_rows = []
+        self._pending_ids = []
+        self._pending_meta = []
+        self._pending_alive = []
+        self._pending_matrix = None
+        self._row_by_id = {law_id: row for row, law_id in enumerate(ids.tolist())}
+        self._size = ids.shape[0]
+    
+    def _compact(self):
+        matrices, scales, ids, meta = [], [], [], []
+        
+        if self._base is not None:
+            keep = np.flatnonzero(self._base_alive)
+            matrices.append(self._base[keep])
+            if self._base_scales is not None:
+                scales.append(self._base_scales[keep])
+            ids.append(self._base_ids[keep])
+            meta.append(self._base_meta[keep])
+        
+        pending = self._pending_block()
+        if pending is not None:
+            keep = np.flatnonzero(np.array(self._pending_alive, dtype=bool))
+            rows = pending[keep]
+            if self.quantized:
+                rows, row_scales = quantization.quantize_rows(rows)
+                scales.append(row_scales)
+            matrices.append(rows)
+            ids.append(np.array(self._pending_ids, dtype=np.int64)[keep])
+            meta.append(np.array(self._pending_meta, dtype=METADATA_DTYPE)[keep])
+        
+        if not matrices:
+            return
+        
+        self._set_base(
+            sparse.vstack(matrices, format='csr'),
+            np.concatenate(ids),
+            np.concatenate(meta),
+            np.concatenate(scales) if self.quantized else None
+        )
+    
+    def _track_watermark(self, updated_at):
+        if updated_at and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+    
+    def _load_rows(self, query):
+        loaded = 0
+        for law_id, category, source, language, published, embedding, indices, dim, dtype, updated_at in \
+                query.yield_per(1000):
+            if embedding:
+                vector = sparse_embeddings.decode(embedding, dtype, indices, dim)
+                self._put(law_id, self._normalize(vector), (category, source, language, date_ordinal(published)))
+                loaded += 1
+            else:
+                self._delete(law_id)
+            self._track_watermark(updated_at)
+        return loaded
+    
+    def _bulk_load(self, query):
+        data, indices, lengths, ids, meta = [], [], [], [], []
+        
+        for law_id, category, source, language, published, embedding, cols, dim, dtype, updated_at in \
+                query.yield_per(1000):
+            self._track_watermark(updated_at)
+            if not embedding:
+                continue
+            
+            vector = sparse_embeddings.decode(embedding, dtype, cols, dim)
+            if self._dim is None:
+                self._dim = vector.shape[1]
+            elif vector.shape[1] != self._dim:
+                logger.warning(f"Skipping id {law_id} in {self.label}: dimension {vector.shape[1]} "
+                               f"does not match index dimension {self._dim}")
+                continue
+            
+            data.append(vector.data)
+            indices.append(vector.indices)
+            lengths.append(vector.nnz)
+            ids.append(law_id)
+            meta.append(self._encode_metadata((category, source, language, date_ordinal(published))))
+        
+        if not ids:
+            return 0
+        
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        matrix = sparse.csr_matrix(
+            (np.concatenate(data), np.concatenate(indices), indptr),
+            shape=(len(ids), self._dim)
+        )
+        
+        self._set_base(
+            self._normalize(matrix),
+            np.array(ids, dtype=np.int64),
+            np.array(meta, dtype=METADATA_DTYPE)
+        )
+        return len(ids)
+    
+    def _id_column(self):
+        return LabourLaw.id
+    
+    def _watermark_column(self):
+        return LabourLaw.updated_at
+    
+    def _rows_query(self, version):
+        return db.session.query(
+            LabourLaw.id,
+            LabourLaw.category,
+            LabourLaw.source,
+            LabourLaw.language,
+            LabourLaw.publication_date,
+            LabourLaw.embedding,
+            LabourLaw.embedding_indices,
+            LabourLaw.embedding_dim,
+            LabourLaw.embedding_dtype,
+            LabourLaw.updated_at
+        ).filter(LabourLaw.embedding_version == version)
+    
+    def _vectors_query(self, ids, version):
+        return db.session.query(
+            LabourLaw.id,
+            LabourLaw.embedding,
+            LabourLaw.embedding_indices,
+            LabourLaw.embedding_dim,
+            LabourLaw.embedding_dtype
+        ).filter(LabourLaw.id.in_(ids), LabourLaw.embedding_version == version)
+    
+    def _db_state(self):
+        id_column = self._id_column()
+        return db.session.query(
+            db.func.count(id_column),
+            db.func.max(self._watermark_column()),
+            db.func.coalesce(db.func.max(id_column), 0),
+            db.func.count(db.case((id_column > self._max_id, 1)))
+        ).one()
+    
+    def _prune_deleted(self):
+        existing = {row_id for (row_id,) in db.session.query(self._id_column())}
+        deleted = [row_id for row_id in self._row_by_id if row_id not in existing]
+        for row_id in deleted:
+            self._delete(row_id)
+        return len(deleted)
+    
+    def build(self, version=None):
+        version = version or embedding_service.active_version
+        started = time.perf_counter()
+        
+        with self._lock:
+            self._reset(version)
+            self._db_count, _, self._max_id, _ = self._db_state()
+            loaded = self._bulk_load(self._rows_query(version).order_by(self._id_column()))
+            self._loaded = True
+            self._synced_at = time.monotonic()
+            self._generation += 1
+        
+        logger.info(f"Built {self.label} for {version}: {loaded} vectors, {self.nnz} non-zeros "
+                    f"({self.quantization}, {self.memory_bytes / 2**20:.1f} MB) in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        return loaded
+    
+    def sync(self):
+        with self._lock:
+            count, max_updated, max_id, new_rows = self._db_state()
+            changed = False
+            
+            # Ids only grow, so fewer rows than before plus the new ones means rows were
+            # deleted, e.g. a law's passages replaced by another process.
+            if count < self._db_count + new_rows:
+                changed = self._prune_deleted() > 0
+            
+            if new_rows or (max_updated and (self._watermark is None or max_updated > self._watermark)):
+                query = self._rows_query(self._version)
+                if self._watermark is not None:
+                    query = query.filter(db.or_(
+                        self._watermark_column() >= self._watermark,
+                        self._id_column() > self._max_id
+                    ))
+                self._load_rows(query)
+                changed = True
+            
+            self._db_count = count
+            self._max_id = max_id
+            if changed:
+                self._generation += 1
+            
+            self._synced_at = time.monotonic()
+    
+    def ensure_ready(self):
+        version = embedding_service.active_version
+        
+        if not self._loaded or self._version != version:
+            self.build(version)
+        elif time.monotonic() - self._synced_at > self.sync_interval:
+            self.sync()
+    
+    def snapshot(self):
+        self.ensure_ready()
+        
+        with self._lock:
+            self._compact()
+            return self._version, self._base_ids.copy(), self._float_rows(self._base, self._base_scales)
+    
+    def _float_rows(self, matrix, scales):
+        if matrix is None or scales is None:
+            return matrix
+        return quantization.dequantize_rows(matrix, scales)
+    
+    def ids(self):
+        with self._lock:
+            return np.fromiter(self._row_by_id.keys(), dtype=np.int64, count=len(self._row_by_id))
+    
+    def vectors_for(self, law_ids):
+        with self._lock:
+            rows = [self._row_by_id[law_id] for law_id in law_ids if law_id in self._row_by_id]
+            if not rows:
+                return np.empty(0, dtype=np.int64), None
+            
+            rows = np.array(rows, dtype=np.int64)
+            base_rows = rows[rows < self._base_rows]
+            pending_rows = rows[rows >= self._base_rows] - self._base_rows
+            
+            matrices, ids = [], []
+            if base_rows.size:
+                scales = self._base_scales[base_rows] if self._base_scales is not None else None
+                matrices.append(self._float_rows(self._base[base_rows], scales))
+                ids.append(self._base_ids[base_rows])
+            if pending_rows.size:
+                matrices.append(self._pending_block()[pending_rows])
+                ids.append(np.array(self._pending_ids, dtype=np.int64)[pending_rows])
+            
+            return np.concatenate(ids), sparse.vstack(matrices, format='csr')
+    
+    def upsert(self, law_id, embedding, metadata=None, version=None):
+        with self._lock:
+            if not self._loaded:
+                return
+            
+            if version != self._version or embedding is None:
+                self._delete(law_id)
+                self._notify(law_id, None)
+                return
+            
+            vector = self._normalize(embedding)
+            self._put(law_id, vector, metadata)
+            self._notify(law_id, vector)
+    
+    def remove(self, law_id):
+        with self._lock:
+            self._delete(law_id)
+            self._notify(law_id, None)
+    
+    def _score(self, query, rows=None):
+        base, scales, pending = self._base, self._base_scales, self._pending_block()
+        
+        if rows is not None:
+            split = self._base_rows
+            base_rows = rows[rows < split]
+            pending_rows = rows[rows >= split] - split
+            base = base[base_rows] if base_rows.size else None
+            scales = scales[base_rows] if base is not None and scales is not None else None
+            pending = pending[pending_rows] if pending_rows.size else None
+        
+        parts = []
+        if base is not None:
+            if scales is None:
+                parts.append(base @ query)
+            else:
+                parts.append(quantization.scores(base, scales, *quantization.quantize_query(query)))
+        if pending is not None:
+            parts.append(pending @ query)
+        return np.concatenate(parts)
+    
+    def _rerank(self, candidate_ids, query, version):
+        ids, vectors = [], []
+        for row_id, embedding, indices, dim, dtype in self._vectors_query(candidate_ids, version):
+            if not embedding:
+                continue
+            vector = sparse_embeddings.decode(embedding, dtype, indices, dim)
+            if vector.shape[1] == query.shape[0]:
+                ids.append(row_id)
+                vectors.append(vector)
+        
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.array(ids, dtype=np.int64), self._normalize(sparse.vstack(vectors, format='csr')) @ query
+    
+    def search(self, query_embedding, version=None, limit=10, min_score=0.0, filters=None):
+        if query_embedding is None or limit <= 0:
+            return []
+        
+        filters = filters or NO_FILTERS
+        self.ensure_ready()
+        
+        query = self._normalize_query(query_embedding)
+        
+        with self._lock:
+            if version is not None and version != self._version:
+                return []
+            if self._size == 0 or query.shape[0] != self._dim:
+                return []
+            
+            version = self._version
+            rerank = self._base_scales is not None and self.rerank_factor > 0
+            ids = np.concatenate([self._base_ids, np.array(self._pending_ids, dtype=np.int64)])
+            mask = np.concatenate([self._base_alive, np.array(self._pending_alive, dtype=bool)])
+            
+            if filters.active:
+                meta = np.concatenate([self._base_meta, np.array(self._pending_meta, dtype=METADATA_DTYPE)])
+                matching = self._filter_mask(meta, filters)
+                if matching is None:
+                    return []
+                mask &= matching
+            
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return []
+            
+            if rows.size * 2 < mask.shape[0]:
+                scores = self._score(query, rows)
+                ids = ids[rows]
+            else:
+                scores = self._score(query)
+                scores[~mask] = -np.inf
+        
+        k = min(limit * self.rerank_factor if rerank else limit, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        
+        if rerank:
+            ids, scores = self._rerank(ids[top].tolist(), query, version)
+            top = np.argsort(-scores)[:limit]
+        else:
+            top = top[np.argsort(-scores[top])]
+        
+        return [
+            (int(ids[i]), float(scores[i]))
+            for i in top
+            if scores[i] >= min_score
+        ]
+    
+    def evaluate_quantization(self, sample_size=200, k=10, min_score=0.0):
+        version = embedding_service.active_version
+        exact = type(self)(sync_interval=float('inf'), quantization='none')
+        quantized = type(self)(sync_interval=float('inf'), quantization='int8')
+        exact.build(version)
+        quantized.build(version)
+        
+        _, ids, matrix = exact.snapshot()
+        if matrix is None:
+            return None
+        
+        rng = np.random.default_rng(0)
+        queries = rng.choice(ids.shape[0], min(sample_size, ids.shape[0]), replace=False)
+        
+        hits = {'int8': 0, 'int8_rerank': 0}
+        timings = {'float': 0.0, 'int8': 0.0, 'int8_rerank': 0.0}
+        expected = 0
+        
+        for row in queries:
+            query = matrix[row]
+            
+            started = time.perf_counter()
+            truth = {law_id for law_id, _ in exact.search(query, version, k, min_score)}
+            timings['float'] += time.perf_counter() - started
+            expected += len(truth)
+            
+            for name, factor in (('int8', 0), ('int8_rerank', self.rerank_factor)):
+                quantized.rerank_factor = factor
+                started = time.perf_counter()
+                found = quantized.search(query, version, k, min_score)
+                timings[name] += time.perf_counter() - started
+                hits[name] += len(truth & {law_id for law_id, _ in found})
+        
+        return {
+            'index': self.label,
+            'queries': int(queries.shape[0]),
+            'k': k,
+            'min_score': min_score,
+            'rerank_factor': self.rerank_factor,
+            'float_bytes': exact.memory_bytes,
+            'int8_bytes': quantized.memory_bytes,
+            'recall_int8': hits['int8'] / expected if expected else 1.0,
+            'recall_int8_rerank': hits['int8_rerank'] / expected if expected else 1.0,
+            'ms_per_query': {name: t * 1000 / queries.shape[0] for name, t in timings.items()}
+        }
+
+vector_index = VectorIndex()
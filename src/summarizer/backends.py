@@ -0,0 +1,14 @@
+from config.settings import Config
+from src.summarizer.groq_summarizer import groq_summarizer
+from src.summarizer.extractive_summarizer import extractive_summarizer
+
+SUMMARIZER_BACKENDS = {
+    'groq': groq_summarizer,
+    'extractive': extractive_summarizer
+}
+
+def get_summarizer(backend=None):
+    backend = backend or Config.SUMMARIZER_BACKEND
+    if backend not in SUMMARIZER_BACKENDS:
+        raise ValueError(f"Unknown summarizer backend: {backend}")
+    return SUMMARIZER_BACKENDS[backend]
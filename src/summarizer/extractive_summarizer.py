@@ -0,0 +1,152 @@
+import re
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from config.settings import Config
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.;:?!])\s+|\n+')
+TOKEN_PATTERN = re.compile(r'[a-z]{3,}')
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 600
+MAX_RANKED_SENTENCES = 600
+DAMPING = 0.85
+REDUNDANCY_THRESHOLD = 0.7
+
+class ExtractiveSummarizer:
+    
+    model = 'textrank-centroid'
+    PROMPT_VERSION = 'extractive-v1'
+    CHUNK_PROMPT_VERSION = None
+    
+    def __init__(self, sentences=None):
+        self.sentences = sentences or Config.SUMMARY_EXTRACTIVE_SENTENCES
+    
+    @property
+    def available(self):
+        return True
+    
+    @property
+    def cacheable(self):
+        return False
+    
+    def needs_chunking(self, text):
+        return False
+    
+    def chunk(self, text, title=''):
+        return []
+    
+    def split_sentences(self, text, title=""):
+        title = (title or '').strip().lower()
+        seen = set()
+        sentences = []
+        
+        for sentence in SENTENCE_BOUNDARY.split(text or ''):
+            sentence = sentence.strip()
+            key = sentence.lower()
+            if len(sentence) < MIN_SENTENCE_CHARS or key in seen or key == title:
+                continue
+            seen.add(key)
+            sentences.append(sentence[:MAX_SENTENCE_CHARS])
+        
+        return sentences
+    
+    def _vectors(self, sentences):
+        vocabulary = {}
+        rows, cols = [], []
+        for row, sentence in enumerate(sentences):
+            for token in TOKEN_PATTERN.findall(sentence.lower()):
+                if token not in ENGLISH_STOP_WORDS:
+                    rows.append(row)
+                    cols.append(vocabulary.setdefault(token, len(vocabulary)))
+        
+        # Sentences x vocabulary is mostly zeros; a dense matrix for a long Code runs
+        # into gigabytes, so the TF-IDF vectors stay sparse throughout.
+        vectors = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(sentences), max(len(vocabulary), 1))
+        )
+        vectors.sum_duplicates()
+        
+        document_frequency = np.bincount(vectors.indices, minlength=vectors.shape[1])
+        idf = np.log((1.0 + len(sentences)) / (1.0 + document_frequency)) + 1.0
+        vectors.data = ((1.0 + np.log(vectors.data)) * idf[vectors.indices]).astype(np.float32)
+        
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        return sparse.diags(1.0 / np.maximum(norms, 1e-12)).astype(np.float32) @ vectors
+    
+    def _centroid_scores(self, vectors):
+        centroid = np.asarray(vectors.mean(axis=0)).ravel()
+        norm = np.linalg.norm(centroid)
+        if norm == 0:
+            return np.zeros(vectors.shape[0], dtype=np.float32)
+        return vectors @ (centroid / norm)
+    
+    def _textrank(self, vectors, teleport, iterations=50, tolerance=1e-6):
+        similarity = (vectors @ vectors.T).toarray()
+        np.fill_diagonal(similarity, 0.0)
+        np.maximum(similarity, 0.0, out=similarity)
+        
+        out_weight = similarity.sum(axis=1, keepdims=True)
+        transition = np.where(out_weight > 0, similarity / np.maximum(out_weight, 1e-12), 1.0 / len(similarity))
+        
+        ranks = teleport.copy()
+        for _ in range(iterations):
+            updated = (1 - DAMPING) * teleport + DAMPING * (transition.T @ ranks)
+            if np.abs(updated - ranks).sum() < tolerance:
+                return updated
+            ranks = updated
+        return ranks
+    
+    def rank(self, sentences):
+        vectors = self._vectors(sentences)
+        centroid_scores = self._centroid_scores(vectors)
+        
+        # Long Codes have thousands of sentences; TextRank is quadratic, so only the
+        # sentences closest to the document centroid take part in the graph.
+        candidates = np.arange(len(sentences))
+        if len(sentences) > MAX_RANKED_SENTENCES:
+            candidates = np.sort(np.argsort(-centroid_scores)[:MAX_RANKED_SENTENCES])
+        
+        teleport = np.maximum(centroid_scores[candidates], 0.0).astype(np.float64)
+        teleport = teleport / teleport.sum() if teleport.sum() > 0 else np.full(len(candidates), 1.0 / len(candidates))
+        
+        ranks = self._textrank(vectors[candidates].astype(np.float64), teleport)
+        return candidates, ranks, vectors
+    
+    def select(self, text, title="", count=None):
+        count = count or self.sentences
+        sentences = self.split_sentences(text, title)
+        if len(sentences) <= count:
+            return sentences
+        
+        candidates, ranks, vectors = self.rank(sentences)
+        
+        chosen = []
+        for index in candidates[np.argsort(-ranks, kind='stable')]:
+            if chosen and (vectors[chosen] @ vectors[index].T).max() > REDUNDANCY_THRESHOLD:
+                continue
+            chosen.append(index)
+            if len(chosen) == count:
+                break
+        
+        return [sentences[index] for index in sorted(chosen)]
+    
+    def summarize(self, text, title="", fallback=True, chunk_summaries=None):
+        if not text or len(text) < 100:
+            return "Content too short to summarize."
+        
+        sentences = self.select(text, title)
+        if not sentences:
+            return text[:500].strip()
+        return '\n'.join(f"- {sentence}" for sentence in sentences)
+    
+    def summarize_batch(self, items, workers=None):
+        return [
+            {**item, 'summary': self.summarize(item.get('content', ''), item.get('title', ''))}
+            for item in items
+        ]
+    
+    def _generate_fallback_summary(self, text, title, reason=None):
+        return self.summarize(text, title)
+
+extractive_summarizer = ExtractiveSummarizer()
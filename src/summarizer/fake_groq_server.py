@@ -0,0 +1,113 @@
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.summarizer.rate_limiter import TokenBucket
+
+COMPLETIONS_PATH = '/openai/v1/chat/completions'
+
+class FakeGroqState:
+    
+    def __init__(self, rpm, tpm, latency, completion_tokens):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.served = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+    
+    def admit(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                self.throttled += 1
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.served += 1
+            return 0.0
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    
+    state = None
+    
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def do_POST(self):
+        if self.path != COMPLETIONS_PATH:
+            self._send(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'not_found'}})
+            return
+        
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        messages = request.get('messages', [])
+        prompt_tokens = sum(len(message.get('content') or '') for message in messages) // 4
+        completion_tokens = min(request.get('max_tokens') or self.state.completion_tokens, self.state.completion_tokens)
+        
+        wait = self.state.admit(prompt_tokens + completion_tokens)
+        if wait > 0:
+            self._send(429, {'error': {'message': 'Rate limit reached', 'type': 'tokens', 'code': 'rate_limit_exceeded'}},
+                       headers={'retry-after': f'{wait:.2f}'})
+            return
+        
+        time.sleep(self.state.latency)
+        
+        title = next((line for line in (messages[-1].get('content') or '').splitlines() if line.startswith('Title:')), 'Title:')
+        self._send(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': f'Summary of {title[6:].strip() or "document"}.'},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+    
+    def log_message(self, format, *args):
+        pass
+
+def serve(port=8765, rpm=30, tpm=6000, latency=0.2, completion_tokens=150):
+    FakeGroqHandler.state = FakeGroqState(rpm, tpm, latency, completion_tokens)
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGroqHandler)
+    server.daemon_threads = True
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Rate-limited stand-in for the Groq chat completions API')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rpm', type=int, default=30, help='Requests per minute before answering 429')
+    parser.add_argument('--tpm', type=int, default=6000, help='Tokens per minute before answering 429')
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds spent on each completion')
+    parser.add_argument('--completion-tokens', type=int, default=150)
+    args = parser.parse_args()
+    
+    server = serve(args.port, args.rpm, args.tpm, args.latency, args.completion_tokens)
+    print(f"Fake Groq API on http://127.0.0.1:{args.port} (set GROQ_BASE_URL to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state = FakeGroqHandler.state
+        print(f"Served {state.served} completions, throttled {state.throttled} requests")
+
+if __name__ == '__main__':
+    main()
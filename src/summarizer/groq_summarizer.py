@@ -1,33 +1,90 @@
+import hashlib
 import os
-from groq import Groq
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import has_app_context
+from groq import Groq, RateLimitError, APIConnectionError, InternalServerError
+from config.settings import Config
+from src.preprocessor.chunker import section_chunker
+from src.preprocessor.text_processor import text_processor
+from src.summarizer.extractive_summarizer import extractive_summarizer
+from src.summarizer.metrics import summarizer_metrics
+from src.summarizer.rate_limiter import RateLimiter
+from src.summarizer.summary_cache import cache_key, summary_cache
 from src.utils.logger import logger
 
+CHARS_PER_TOKEN = 4
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
 class GroqSummarizer:
     
+    PROMPT_VERSION = 'v2'
+    CHUNK_PROMPT_VERSION = 'chunk-v1'
+    
     def __init__(self):
         self.api_key = os.getenv('GROQ_API_KEY')
         self.client = None
         self.model = 'llama-3.1-8b-instant'
+        self.max_tokens = 1000
+        self.max_retries = Config.GROQ_MAX_RETRIES
+        self.limiter = RateLimiter(Config.GROQ_REQUESTS_PER_MINUTE, Config.GROQ_TOKENS_PER_MINUTE)
+        self.metrics = summarizer_metrics
         
         if self.api_key:
             try:
-                self.client = Groq(api_key=self.api_key)
+                self.client = Groq(api_key=self.api_key, base_url=os.getenv('GROQ_BASE_URL') or None, max_retries=0)
                 logger.info("Groq client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Groq client: {e}")
     
-    def summarize(self, text, title=""):
+    @property
+    def available(self):
+        return self.client is not None
+    
+    @property
+    def cacheable(self):
+        return self.available
+    
+    def summarize(self, text, title="", fallback=True, chunk_summaries=None):
         if not self.client:
             logger.warning("Groq client not initialized. Returning placeholder summary.")
-            return self._generate_fallback_summary(text, title)
+            return self._generate_fallback_summary(text, title, 'no_client')
         
         if not text or len(text) < 100:
             return "Content too short to summarize."
         
         try:
-            truncated_text = text[:8000] if len(text) > 8000 else text
+            if self.needs_chunking(text):
+                summary = self._map_reduce(text, title, {} if chunk_summaries is None else chunk_summaries)
+            else:
+                summary = self._summarize_text(text[:Config.SUMMARY_INPUT_MAX_CHARS], title)
             
-            prompt = f"""You are a legal document summarizer specializing in Indian labour laws. 
+            logger.info(f"Successfully generated summary for: {title[:50]}...")
+            return summary
+            
+        except Exception as e:
+            logger.error(f"Error generating summary: {e}")
+            if not fallback:
+                raise
+            return self._generate_fallback_summary(text, title, type(e).__name__)
+    
+    def _ask(self, prompt, max_tokens=None):
+        response = self._complete([
+            {
+                "role": "system",
+                "content": "You are a precise legal document summarizer. Provide factual summaries without interpretation."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ], max_tokens)
+        
+        return response.choices[0].message.content.strip()
+    
+    def _summarize_text(self, text, title):
+        prompt = f"""You are a legal document summarizer specializing in Indian labour laws. 
 Summarize the following law/regulation in a clear, factual manner.
 
 IMPORTANT RULES:
@@ -40,58 +97,185 @@ IMPORTANT RULES:
 Title: {title}
 
 Content:
-{truncated_text}
+{text}
 
 Summary:"""
+        
+        return self._ask(prompt)
+    
+    def needs_chunking(self, text):
+        return Config.SUMMARY_MODE == 'map_reduce' and len(text or '') > Config.SUMMARY_INPUT_MAX_CHARS
+    
+    def chunk(self, text, title=''):
+        return [
+            (cache_key(hashlib.sha256(chunk.encode('utf-8')).hexdigest(), title), chunk)
+            for chunk in section_chunker.chunks(text)
+        ]
+    
+    def _summarize_chunk(self, text, title):
+        prompt = f"""The following is one part of an Indian labour law/regulation.
+List the provisions it contains in a clear, factual manner.
+
+IMPORTANT RULES:
+1. Be factual - do not provide legal interpretation or advice
+2. Keep section numbers and legal definitions exactly as stated
+3. Include obligations, applicability, penalties and effective dates if mentioned
+4. Use short bullet points, at most 150 words
+
+Title: {title}
+
+Part:
+{text}
+
+Provisions:"""
+        
+        return self._ask(prompt, Config.SUMMARY_CHUNK_MAX_TOKENS)
+    
+    def _combine(self, partials, title, final):
+        parts = '\n\n'.join(f"Part {number}:\n{partial}" for number, partial in enumerate(partials, 1))
+        length = "Keep the summary concise but comprehensive (200-400 words)" if final \
+            else "Use short bullet points, at most 150 words"
+        
+        prompt = f"""You are a legal document summarizer specializing in Indian labour laws.
+The following are summaries of consecutive parts of one law/regulation.
+Combine them into a single summary in a clear, factual manner.
+
+IMPORTANT RULES:
+1. Be factual - do not provide legal interpretation or advice
+2. Maintain important legal definitions exactly as stated
+3. Include key provisions, applicability, and effective dates if mentioned
+4. {length}
+5. Use bullet points for multiple provisions
+
+Title: {title}
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a precise legal document summarizer. Provide factual summaries without interpretation."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
+{parts}
+
+Summary:"""
+        
+        return self._ask(prompt, None if final else Config.SUMMARY_CHUNK_MAX_TOKENS)
+    
+    def _map_reduce(self, text, title, chunk_summaries):
+        chunks = self.chunk(text, title)
+        missing = {chunk_hash: chunk for chunk_hash, chunk in chunks if chunk_hash not in chunk_summaries}
+        
+        if missing:
+            errors = []
+            with ThreadPoolExecutor(max_workers=min(len(missing), Config.SUMMARY_WORKERS),
+                                    thread_name_prefix='summarize-chunk') as pool:
+                futures = {
+                    pool.submit(self._summarize_chunk, chunk, title): chunk_hash
+                    for chunk_hash, chunk in missing.items()
+                }
+                for future in as_completed(futures):
+                    try:
+                        chunk_summaries[futures[future]] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+            if errors:
+                raise errors[0]
+        
+        logger.info(f"Summarized {len(missing)} of {len(chunks)} chunks for: {title[:50]}...")
+        
+        partials = [chunk_summaries[chunk_hash] for chunk_hash, _ in chunks]
+        while len('\n\n'.join(partials)) > Config.SUMMARY_INPUT_MAX_CHARS and len(partials) > 1:
+            groups = [[]]
+            for partial in partials:
+                if groups[-1] and len('\n\n'.join(groups[-1] + [partial])) > Config.SUMMARY_INPUT_MAX_CHARS:
+                    groups.append([])
+                groups[-1].append(partial)
+            if len(groups) == len(partials):
+                break
+            partials = [group[0] if len(group) == 1 else self._combine(group, title, final=False) for group in groups]
+        
+        return self._combine(partials, title, final=True)
+    
+    def _retry_delay(self, error, attempt):
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 2 ** attempt
+        
+        return delay + random.uniform(0, delay / 4 + 0.1)
+    
+    def _complete(self, messages, max_tokens=None):
+        max_tokens = max_tokens or self.max_tokens
+        estimate = sum(len(message['content']) for message in messages) // CHARS_PER_TOKEN + max_tokens
+        
+        for attempt in range(self.max_retries + 1):
+            self.metrics.record_wait(self.limiter.acquire(estimate))
             
-            summary = response.choices[0].message.content
-            logger.info(f"Successfully generated summary for: {title[:50]}...")
-            return summary.strip()
+            started = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=max_tokens
+                )
+            except Exception as e:
+                self.metrics.record_call(time.perf_counter() - started, type(e).__name__)
+                if not isinstance(e, RETRYABLE_ERRORS) or attempt == self.max_retries:
+                    raise
+                
+                self.metrics.record_retry(type(e).__name__)
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"Groq request failed ({type(e).__name__}), retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1}/{self.max_retries})")
+                if isinstance(e, RateLimitError):
+                    self.limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
             
+            usage = getattr(response, 'usage', None)
+            self.metrics.record_call(time.perf_counter() - started, 'ok', usage)
+            self.limiter.settle(estimate, usage.total_tokens if usage is not None else None)
+            return response
+    
+    def _summarize_uncached(self, item):
+        try:
+            return self.summarize(item.get('content', ''), item.get('title', ''), fallback=False), True
         except Exception as e:
-            logger.error(f"Error generating summary: {e}")
-            return self._generate_fallback_summary(text, title)
+            return self._generate_fallback_summary(item.get('content', ''), item.get('title', ''), type(e).__name__), False
     
-    def summarize_batch(self, items):
-        results = []
+    def summarize_batch(self, items, workers=None):
+        items = list(items)
+        use_cache = self.cacheable and has_app_context()
+        
+        keys = [
+            cache_key(
+                item.get('content_hash') or text_processor.generate_content_hash(item.get('content', '')),
+                item.get('title', '')
+            ) or index
+            for index, item in enumerate(items)
+        ]
+        cached = summary_cache.get_many((key for key in keys if isinstance(key, str)), self) if use_cache else {}
+        
+        pending = {}
+        for key, item in zip(keys, items):
+            if key not in cached:
+                pending.setdefault(key, item)
         
-        for item in items:
-            text = item.get('content', '')
-            title = item.get('title', '')
-            summary = self.summarize(text, title)
-            results.append({
-                **item,
-                'summary': summary
-            })
+        with ThreadPoolExecutor(max_workers=workers or Config.SUMMARY_WORKERS, thread_name_prefix='summarize') as pool:
+            results = dict(zip(pending, pool.map(self._summarize_uncached, pending.values())))
         
-        return results
+        summaries = dict(cached)
+        for key, (summary, succeeded) in results.items():
+            summaries[key] = summary
+            if use_cache and succeeded and isinstance(key, str):
+                summary_cache.put(key, summary, self)
+        
+        return [{**item, 'summary': summaries[key]} for key, item in zip(keys, items)]
     
-    def _generate_fallback_summary(self, text, title):
+    def _generate_fallback_summary(self, text, title, reason='unknown'):
+        self.metrics.record_fallback(reason)
         if not text:
             return "No content available for summarization."
         
-        sentences = text.split('.')
-        first_sentences = '. '.join(sentences[:5]).strip()
-        
-        if len(first_sentences) > 500:
-            first_sentences = first_sentences[:500] + "..."
-        
-        return f"[Auto-generated excerpt] {title}: {first_sentences}"
+        return f"[Auto-generated excerpt] {title}:\n{extractive_summarizer.summarize(text, title)}"
 
 groq_summarizer = GroqSummarizer()
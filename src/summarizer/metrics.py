@@ -0,0 +1,136 @@
+import bisect
+import copy
+import threading
+from collections import Counter
+from config.settings import Config
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+WAIT_BUCKETS = (0.01, 0.1, 0.5, 1, 5, 15, 60)
+
+class Histogram:
+    
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+    
+    @property
+    def count(self):
+        return sum(self.counts)
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+    
+    def since(self, earlier):
+        delta = Histogram(self.bounds)
+        delta.counts = [now - before for now, before in zip(self.counts, earlier.counts)]
+        delta.total = self.total - earlier.total
+        return delta
+    
+    def quantile(self, q):
+        count = self.count
+        if not count:
+            return 0.0
+        
+        seen = 0
+        for bound, bucket in zip(self.bounds, self.counts):
+            seen += bucket
+            if seen >= q * count:
+                return bound
+        return self.bounds[-1]
+    
+    def to_dict(self):
+        count = self.count
+        cumulative = 0
+        buckets = []
+        for bound, bucket in zip(self.bounds + ['+Inf'], self.counts):
+            cumulative += bucket
+            buckets.append({'le': bound, 'count': cumulative})
+        
+        return {
+            'count': count,
+            'sum': round(self.total, 4),
+            'mean': round(self.total / count, 4) if count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': buckets
+        }
+
+class SummarizerMetrics:
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        with self._lock:
+            self._state = {
+                'latency': Histogram(LATENCY_BUCKETS),
+                'prompt_tokens': Histogram(TOKEN_BUCKETS),
+                'completion_tokens': Histogram(TOKEN_BUCKETS),
+                'limiter_wait': Histogram(WAIT_BUCKETS),
+                'outcomes': Counter(),
+                'retries': Counter(),
+                'fallbacks': Counter()
+            }
+    
+    def record_call(self, latency, outcome='ok', usage=None):
+        with self._lock:
+            self._state['latency'].observe(latency)
+            self._state['outcomes'][outcome] += 1
+            if usage is not None:
+                self._state['prompt_tokens'].observe(usage.prompt_tokens or 0)
+                self._state['completion_tokens'].observe(usage.completion_tokens or 0)
+    
+    def record_wait(self, seconds):
+        with self._lock:
+            self._state['limiter_wait'].observe(seconds)
+    
+    def record_retry(self, reason):
+        with self._lock:
+            self._state['retries'][reason] += 1
+    
+    def record_fallback(self, reason):
+        with self._lock:
+            self._state['fallbacks'][reason] += 1
+    
+    def mark(self):
+        with self._lock:
+            return copy.deepcopy(self._state)
+    
+    def snapshot(self, since=None):
+        state = self.mark()
+        if since is not None:
+            state = {
+                name: value.since(since[name]) if isinstance(value, Histogram) else value - since[name]
+                for name, value in state.items()
+            }
+        
+        calls = sum(state['outcomes'].values())
+        prompt_tokens = int(state['prompt_tokens'].total)
+        completion_tokens = int(state['completion_tokens'].total)
+        cost = (prompt_tokens * Config.GROQ_INPUT_COST_PER_MILLION
+                + completion_tokens * Config.GROQ_OUTPUT_COST_PER_MILLION) / 1e6
+        
+        return {
+            'calls': calls,
+            'outcomes': dict(state['outcomes']),
+            'throttled_ratio': round(state['outcomes'].get('RateLimitError', 0) / calls, 4) if calls else 0.0,
+            'retries': dict(state['retries']),
+            'fallbacks': dict(state['fallbacks']),
+            'tokens': {
+                'prompt': prompt_tokens,
+                'completion': completion_tokens,
+                'total': prompt_tokens + completion_tokens
+            },
+            'estimated_cost_usd': round(cost, 6),
+            'latency_seconds': state['latency'].to_dict(),
+            'prompt_tokens': state['prompt_tokens'].to_dict(),
+            'completion_tokens': state['completion_tokens'].to_dict(),
+            'limiter_wait_seconds': state['limiter_wait'].to_dict()
+        }
+
+summarizer_metrics = SummarizerMetrics()
@@ -0,0 +1,96 @@
+import random
+import threading
+import time
+
+# After a 429 the effective rate is multiplied by DECREASE_FACTOR; every successful
+# call then adds RECOVERY_STEP back until the configured rate is reached again.
+DECREASE_FACTOR = 0.5
+RECOVERY_STEP = 0.02
+MIN_RATE_FACTOR = 0.05
+WAKE_JITTER = 0.25
+
+class TokenBucket:
+    
+    def __init__(self, per_minute, capacity=None):
+        self.base_rate = per_minute / 60.0
+        self.rate = self.base_rate
+        self.capacity = float(capacity or per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount, now):
+        self.refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def take(self, amount):
+        self.tokens -= amount
+    
+    def give(self, amount, now):
+        self.refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+    
+    def scale(self, factor, now):
+        self.refill(now)
+        self.rate = self.base_rate * factor
+
+class RateLimiter:
+    
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.waited_seconds = 0.0
+        self.rate_factor = 1.0
+        self._lock = threading.Lock()
+    
+    def _taken(self, tokens):
+        return min(tokens, self.tokens.capacity)
+    
+    def _set_rate_factor(self, factor, now):
+        self.rate_factor = factor
+        for bucket in (self.requests, self.tokens):
+            bucket.scale(factor, now)
+    
+    def acquire(self, tokens):
+        tokens = self._taken(tokens)
+        started = time.monotonic()
+        
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(tokens, now)
+                )
+                if delay <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    self.waited_seconds += now - started
+                    return now - started
+            # Jitter each waiter so the ones released by the same refill or pause
+            # do not all hit the API in the same instant.
+            time.sleep(delay + random.uniform(0, delay * WAKE_JITTER))
+    
+    def pause(self, seconds):
+        with self._lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self._set_rate_factor(max(self.rate_factor * DECREASE_FACTOR, MIN_RATE_FACTOR), now)
+            for bucket in (self.requests, self.tokens):
+                bucket.refill(now)
+                bucket.tokens = min(bucket.tokens, 0.0)
+    
+    def settle(self, estimated, actual=None):
+        with self._lock:
+            now = time.monotonic()
+            if actual:
+                self.tokens.give(self._taken(estimated) - actual, now)
+            if self.rate_factor < 1.0:
+                self._set_rate_factor(min(self.rate_factor + RECOVERY_STEP, 1.0), now)
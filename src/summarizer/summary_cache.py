@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from datetime import datetime
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from src.database.db import db
+from models import SummaryCacheEntry
+from config.settings import Config
+from src.utils.logger import logger
+
+EVICTION_CHUNK_SIZE = 200
+
+def cache_key(content_hash, title):
+    # The title is part of every summarization prompt, so a summary is only reused for the
+    # same text under the same title.
+    if not content_hash:
+        return None
+    return hashlib.sha256(f"{title or ''}\n{content_hash}".encode('utf-8')).hexdigest()
+
+class SummaryCache:
+    
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or Config.SUMMARY_CACHE_MAX_MB * 2 ** 20
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    def _key_filter(self, content_hashes, summarizer, prompt_version):
+        return db.and_(
+            SummaryCacheEntry.content_hash.in_(content_hashes),
+            SummaryCacheEntry.model == summarizer.model,
+            SummaryCacheEntry.prompt_version == (prompt_version or summarizer.PROMPT_VERSION)
+        )
+    
+    def get_many(self, content_hashes, summarizer, prompt_version=None):
+        content_hashes = list({content_hash for content_hash in content_hashes if content_hash})
+        if not content_hashes:
+            return {}
+        
+        found = dict(db.session.query(SummaryCacheEntry.content_hash, SummaryCacheEntry.summary).filter(
+            self._key_filter(content_hashes, summarizer, prompt_version)
+        ))
+        
+        if found:
+            db.session.execute(
+                update(SummaryCacheEntry).where(self._key_filter(list(found), summarizer, prompt_version)).values(
+                    hits=SummaryCacheEntry.hits + 1,
+                    last_used_at=datetime.utcnow()
+                )
+            )
+            db.session.commit()
+        
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(content_hashes) - len(found)
+        
+        return found
+    
+    def put(self, content_hash, summary, summarizer, prompt_version=None):
+        if not content_hash or not summary:
+            return
+        
+        db.session.add(SummaryCacheEntry(
+            content_hash=content_hash,
+            model=summarizer.model,
+            prompt_version=prompt_version or summarizer.PROMPT_VERSION,
+            summary=summary,
+            size_bytes=len(summary.encode('utf-8'))
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+    
+    def evict(self):
+        total = db.session.query(func.coalesce(func.sum(SummaryCacheEntry.size_bytes), 0)).scalar()
+        evicted = 0
+        
+        while total > self.max_bytes:
+            rows = db.session.query(SummaryCacheEntry.id, SummaryCacheEntry.size_bytes).order_by(
+                SummaryCacheEntry.last_used_at
+            ).limit(EVICTION_CHUNK_SIZE).all()
+            if not rows:
+                break
+            
+            victims = []
+            for entry_id, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append(entry_id)
+                total -= size or 0
+            
+            SummaryCacheEntry.query.filter(SummaryCacheEntry.id.in_(victims)).delete(synchronize_session=False)
+            db.session.commit()
+            evicted += len(victims)
+        
+        if evicted:
+            logger.info(f"Summary cache evicted {evicted} least recently used entries")
+        return evicted
+    
+    def stats(self):
+        entries, size, stored_hits = db.session.query(
+            func.count(SummaryCacheEntry.id),
+            func.coalesce(func.sum(SummaryCacheEntry.size_bytes), 0),
+            func.coalesce(func.sum(SummaryCacheEntry.hits), 0)
+        ).one()
+        lookups = self.hits + self.misses
+        
+        return {
+            'entries': entries,
+            'bytes': int(size),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'lifetime_hits': int(stored_hits)
+        }
+
+summary_cache = SummaryCache()
@@ -0,0 +1,219 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from sqlalchemy import func, update
+from src.database.db import db
+from models import LabourLaw, SummaryJob
+from config.settings import Config
+from src.summarizer.backends import get_summarizer
+from src.summarizer.summary_cache import cache_key, summary_cache
+from src.utils.logger import logger
+
+class SummaryQueue:
+    
+    def __init__(self, workers=None, max_attempts=None, lease_seconds=None, retry_base_seconds=None):
+        self.workers = workers or Config.SUMMARY_WORKERS
+        self.max_attempts = max_attempts or Config.SUMMARY_MAX_ATTEMPTS
+        self.lease_seconds = lease_seconds or Config.SUMMARY_LEASE_SECONDS
+        self.retry_base_seconds = retry_base_seconds or Config.SUMMARY_RETRY_BASE_SECONDS
+        self._drain_lock = threading.Lock()
+    
+    def enqueue(self, law):
+        law.summary_status = 'pending'
+        
+        job = SummaryJob.query.filter_by(law_id=law.id, status='pending').first()
+        if job:
+            job.law_version = law.version
+            job.next_attempt_at = None
+        else:
+            db.session.add(SummaryJob(law_id=law.id, law_version=law.version, status='pending'))
+    
+    def claim(self, limit):
+        now = datetime.utcnow()
+        expired = now - timedelta(seconds=self.lease_seconds)
+        
+        jobs = SummaryJob.query.filter(db.or_(
+            db.and_(
+                SummaryJob.status == 'pending',
+                db.or_(SummaryJob.next_attempt_at.is_(None), SummaryJob.next_attempt_at <= now)
+            ),
+            db.and_(SummaryJob.status == 'running', SummaryJob.started_at < expired)
+        )).order_by(SummaryJob.id).limit(limit).with_for_update(skip_locked=True).all()
+        
+        if not jobs:
+            db.session.commit()
+            return []
+        
+        laws = {law.id: law for law in LabourLaw.query.filter(
+            LabourLaw.id.in_([job.law_id for job in jobs])
+        )}
+        
+        claimed = []
+        for job in jobs:
+            job.status = 'running'
+            job.started_at = now
+            job.attempts = (job.attempts or 0) + 1
+            law = laws.get(job.law_id)
+            claimed.append((
+                job.id,
+                law.title if law else None,
+                law.content if law else None,
+                law.content_hash if law else None
+            ))
+        db.session.commit()
+        
+        return claimed
+    
+    def _finish(self, job_id, summary, status='done', error=None):
+        job = db.session.get(SummaryJob, job_id)
+        
+        written = db.session.execute(
+            update(LabourLaw).where(
+                LabourLaw.id == job.law_id,
+                LabourLaw.version == job.law_version
+            ).values(summary=summary, summary_status=status, updated_at=LabourLaw.updated_at)
+        ).rowcount
+        
+        job.status = status if written else 'superseded'
+        job.error = error
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        return job.status
+    
+    def _retry(self, job_id, error, title, content, summarizer):
+        job = db.session.get(SummaryJob, job_id)
+        
+        if job.attempts < self.max_attempts:
+            delay = min(self.retry_base_seconds * 2 ** (job.attempts - 1), Config.SUMMARY_RETRY_MAX_SECONDS)
+            job.status = 'pending'
+            job.error = error
+            job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(1.0, 1.25))
+            db.session.commit()
+            return 'retried'
+        
+        logger.error(f"Summary job {job_id} for law {job.law_id} failed after {job.attempts} attempts: {error}")
+        fallback = summarizer._generate_fallback_summary(content, title, 'max_attempts')
+        return self._finish(job_id, fallback, status='failed', error=error)
+    
+    def drain(self, limit=None, workers=None, backend=None):
+        if not self._drain_lock.acquire(blocking=False):
+            logger.warning("Summary queue is already being drained in this process")
+            return None
+        
+        summarizer = get_summarizer(backend)
+        workers = workers or self.workers
+        counts = {'done': 0, 'failed': 0, 'retried': 0, 'superseded': 0, 'cached': 0, 'cached_chunks': 0}
+        started = time.perf_counter()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarizer') as pool:
+                processed = 0
+                while limit is None or processed < limit:
+                    batch = workers * 2 if limit is None else min(workers * 2, limit - processed)
+                    claimed = self.claim(batch)
+                    if not claimed:
+                        break
+                    
+                    keys = {job_id: cache_key(content_hash, title) for job_id, title, _, content_hash in claimed}
+                    cached = {}
+                    if summarizer.cacheable:
+                        cached = summary_cache.get_many(keys.values(), summarizer)
+                    
+                    uncached = {}
+                    for job_id, title, content, _ in claimed:
+                        key = keys[job_id]
+                        if content is None:
+                            counts[self._finish(job_id, None)] += 1
+                        elif key in cached:
+                            counts['cached'] += 1
+                            counts[self._finish(job_id, cached[key])] += 1
+                        else:
+                            uncached.setdefault(key or job_id, []).append((job_id, title, content, key))
+                    
+                    chunked = {
+                        key: [chunk_hash for chunk_hash, _ in summarizer.chunk(jobs[0][2], jobs[0][1])]
+                        for key, jobs in uncached.items()
+                        if summarizer.cacheable and summarizer.needs_chunking(jobs[0][2])
+                    }
+                    cached_chunks = {}
+                    if chunked:
+                        cached_chunks = summary_cache.get_many(
+                            (chunk_hash for chunk_hashes in chunked.values() for chunk_hash in chunk_hashes),
+                            summarizer, summarizer.CHUNK_PROMPT_VERSION
+                        )
+                    
+                    futures = {}
+                    for key, jobs in uncached.items():
+                        _, title, content, _ = jobs[0]
+                        chunk_summaries = {
+                            chunk_hash: cached_chunks[chunk_hash]
+                            for chunk_hash in chunked.get(key, []) if chunk_hash in cached_chunks
+                        }
+                        counts['cached_chunks'] += len(chunk_summaries)
+                        future = pool.submit(summarizer.summarize, content, title, False, chunk_summaries)
+                        futures[future] = (jobs, chunk_summaries, set(chunk_summaries))
+                    
+                    for future in as_completed(futures):
+                        jobs, chunk_summaries, known = futures[future]
+                        for chunk_hash in chunk_summaries.keys() - known:
+                            summary_cache.put(chunk_hash, chunk_summaries[chunk_hash], summarizer,
+                                              summarizer.CHUNK_PROMPT_VERSION)
+                        
+                        try:
+                            summary = future.result()
+                        except Exception as e:
+                            for job_id, title, content, _ in jobs:
+                                counts[self._retry(job_id, str(e), title, content, summarizer)] += 1
+                            continue
+                        
+                        if summarizer.cacheable:
+                            summary_cache.put(jobs[0][3], summary, summarizer)
+                        for job_id, _, _, _ in jobs:
+                            counts[self._finish(job_id, summary)] += 1
+                    
+                    processed += len(claimed)
+                
+                summary_cache.evict()
+        finally:
+            self._drain_lock.release()
+        
+        counts['seconds'] = round(time.perf_counter() - started, 2)
+        if counts['done'] or counts['failed'] or counts['retried']:
+            logger.info(f"Summary queue drained: {counts}")
+        return counts
+    
+    def stats(self):
+        now = datetime.utcnow()
+        hour_ago = now - timedelta(hours=1)
+        
+        by_status = dict(db.session.query(SummaryJob.status, func.count(SummaryJob.id)).group_by(SummaryJob.status))
+        oldest = db.session.query(func.min(SummaryJob.created_at)).filter(SummaryJob.status == 'pending').scalar()
+        waiting_retry = SummaryJob.query.filter(
+            SummaryJob.status == 'pending',
+            SummaryJob.next_attempt_at > now
+        ).count()
+        
+        recent = db.session.query(SummaryJob.created_at, SummaryJob.completed_at).filter(
+            SummaryJob.status.in_(['done', 'failed']),
+            SummaryJob.completed_at >= hour_ago
+        ).all()
+        waits = [(completed - created).total_seconds() for created, completed in recent if created and completed]
+        
+        return {
+            'pending': by_status.get('pending', 0),
+            'waiting_retry': waiting_retry,
+            'running': by_status.get('running', 0),
+            'done': by_status.get('done', 0),
+            'failed': by_status.get('failed', 0),
+            'superseded': by_status.get('superseded', 0),
+            'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+            'completed_last_hour': len(recent),
+            'per_minute_last_hour': round(len(recent) / 60.0, 2),
+            'avg_wait_seconds': round(sum(waits) / len(waits), 1) if waits else 0.0,
+            'workers': self.workers,
+            'cache': summary_cache.stats()
+        }
+
+summary_queue = SummaryQueue()
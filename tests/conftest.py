@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix='labour-law-tests-')
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DATA_DIR, 'test.db')}"
+os.environ['DATA_DIR'] = DATA_DIR
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app, init_db
+    init_db()
+    with app.app_context():
+        yield app
@@ -0,0 +1,50 @@
+import os
+import numpy as np
+from sqlalchemy import insert
+from src.database.db import db
+from models import LabourLaw
+from src.embeddings import sparse as sparse_embeddings
+from src.embeddings.embedding_service import embedding_service
+from src.search.ann_index import IVFIndex
+from src.search.vector_index import vector_index
+
+CORPUS_SIZE = 3000
+CLUSTERS = 40
+DIM = 64
+MIN_RECALL = 0.9
+
+def clustered_vectors(n, clusters, dim, noise=0.15, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    return (centers[labels] + noise * rng.normal(size=(n, dim))).astype(np.float32)
+
+def seed_corpus(vectors):
+    version = embedding_service.active_version
+    rows = []
+    for i, vector in enumerate(vectors):
+        embedding, indices, dim = sparse_embeddings.encode(vector)
+        rows.append({
+            'title': f'Synthetic Act {i}',
+            'content': f'Synthetic law {i}',
+            'url': f'https://example.test/laws/{i}',
+            'embedding': embedding,
+            'embedding_indices': indices,
+            'embedding_dim': dim,
+            'embedding_dtype': 'float32',
+            'embedding_version': version
+        })
+    db.session.execute(insert(LabourLaw), rows)
+    db.session.commit()
+    vector_index.build(version)
+
+def test_ivf_recall_against_brute_force(app, tmp_path):
+    seed_corpus(clustered_vectors(CORPUS_SIZE, CLUSTERS, DIM))
+    
+    index = IVFIndex(path=os.path.join(tmp_path, 'ivf.npz'), nprobe=8, min_train_size=1000)
+    assert index.train()
+    
+    report = index.evaluate_recall(sample_size=200, k=10)
+    
+    assert report['lists'] == int(np.sqrt(CORPUS_SIZE))
+    assert report['recall'] >= MIN_RECALL